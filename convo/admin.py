@@ -0,0 +1,84 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Admin endpoints for looking inside a running convo server.
+
+Each request is answered by whichever worker accepts it, and the numbers
+describe that worker only. The endpoints are off unless CONVO_ADMIN_TOKEN
+is set, and then every admin request needs it in an `X-Admin-Token` header.
+"""
+
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from diagnostics import (
+    AllocationTracker,
+    CallProfiler,
+    LoopLagMonitor,
+    process_stats,
+)
+
+
+def require_token(x_admin_token: Optional[str] = Header(default=None)):
+    token = os.getenv("CONVO_ADMIN_TOKEN")
+    if not token:
+        # Behind ngrok every request comes from localhost, so there is no
+        # safe way to tell the operator apart without a token.
+        raise HTTPException(status_code=403, detail="CONVO_ADMIN_TOKEN is not set")
+    if not hmac.compare_digest(x_admin_token or "", token):
+        raise HTTPException(status_code=403, detail="invalid admin token")
+
+
+def create_admin_router(
+    loop_lag: LoopLagMonitor,
+    call_profiler: CallProfiler,
+    allocations: AllocationTracker,
+) -> APIRouter:
+    router = APIRouter(prefix="/admin", dependencies=[Depends(require_token)])
+
+    @router.get("/loop-lag")
+    async def get_loop_lag():
+        return {"pid": os.getpid(), **loop_lag.stats()}
+
+    @router.get("/calls")
+    async def get_calls():
+        return {"pid": os.getpid(), "calls": call_profiler.stats()}
+
+    @router.post("/tracemalloc/start")
+    async def start_tracemalloc(frames: int = 10):
+        allocations.start(frames)
+        return {"pid": os.getpid(), "tracing": True}
+
+    @router.post("/tracemalloc/stop")
+    async def stop_tracemalloc():
+        allocations.stop()
+        return {"pid": os.getpid(), "tracing": False}
+
+    @router.get("/tracemalloc/snapshot")
+    async def tracemalloc_snapshot(limit: int = 20):
+        return {"pid": os.getpid(), **allocations.snapshot(limit)}
+
+    @router.get("/process")
+    async def get_process(collect: bool = False, limit: int = 20):
+        return {"pid": os.getpid(), **process_stats(collect, limit)}
+
+    @router.post("/profile/{call_id}")
+    async def start_profile(call_id: str, mode: str = "cprofile", duration: int = 30):
+        if mode not in ("cprofile", "pyspy"):
+            raise HTTPException(status_code=400, detail=f"unknown mode {mode}")
+        return {"pid": os.getpid(), **call_profiler.capture(call_id, mode, duration)}
+
+    @router.get("/profile/{call_id}")
+    async def get_profile(call_id: str):
+        result = call_profiler.result(call_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="no profile for this call")
+        return {"pid": os.getpid(), **result}
+
+    return router
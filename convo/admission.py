@@ -0,0 +1,117 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Call admission control for the convo server.
+
+Once the server is saturated every call degrades together, so new calls are
+turned away early instead: the Twilio webhook answers with a short "please
+call back" message when any configured limit is reached.
+"""
+
+import os
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+from diagnostics import LoopLagMonitor
+from registry import CallRegistry
+
+# Upstream services a call can hold a session with; each can be capped.
+PROVIDERS = ("openai", "deepgram", "elevenlabs", "cartesia")
+# The ones every call holds for its whole duration. Cartesia is only leased
+# by calls that hedge TTS.
+CALL_PROVIDERS = ("openai", "deepgram", "elevenlabs")
+# How long an admitted call's slot is held for its media stream to start.
+RESERVATION_SECS = 30.0
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+class AdmissionLimits(BaseModel):
+    max_calls: Optional[int] = None
+    max_loop_lag_ms: Optional[float] = None
+    max_provider_calls: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "AdmissionLimits":
+        lag = os.getenv("CONVO_MAX_LOOP_LAG_MS")
+        return cls(
+            max_calls=_env_int("CONVO_MAX_CALLS"),
+            max_loop_lag_ms=float(lag) if lag else None,
+            max_provider_calls={
+                provider: limit
+                for provider in PROVIDERS
+                if (limit := _env_int(f"CONVO_MAX_{provider.upper()}_CALLS"))
+                is not None
+            },
+        )
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        registry: CallRegistry,
+        loop_lag: LoopLagMonitor,
+        limits: Optional[AdmissionLimits] = None,
+    ):
+        self.registry = registry
+        self.loop_lag = loop_lag
+        self.limits = limits or AdmissionLimits.from_env()
+
+    def admit(self, call_sid: Optional[str]) -> Optional[str]:
+        """Check the limits and, if the call is admitted, reserve its slot.
+
+        Between the webhook answering and the media stream starting, a call
+        isn't active yet; the reservation counts it in the meantime so a burst
+        of calls can't all be admitted against the same free slot.
+        """
+        with self.registry.exclusive():
+            reason = self.check()
+            if reason is None and call_sid:
+                self.registry.reserve_call(call_sid, RESERVATION_SECS)
+        return reason
+
+    def check(self) -> Optional[str]:
+        """Return the reason a new call should be rejected, or None to admit it."""
+        limits = self.limits
+        reserved = self.registry.reserved_calls()
+        if limits.max_calls is not None:
+            active = self.registry.active_calls() + reserved
+            if active >= limits.max_calls:
+                return f"active calls {active} >= {limits.max_calls}"
+
+        if limits.max_loop_lag_ms is not None:
+            lag_ms = self.loop_lag.percentile(99) * 1000
+            if lag_ms >= limits.max_loop_lag_ms:
+                return f"loop lag {lag_ms:.0f}ms >= {limits.max_loop_lag_ms:.0f}ms"
+
+        if limits.max_provider_calls:
+            counts = self.registry.provider_calls()
+            for provider, limit in limits.max_provider_calls.items():
+                sessions = counts.get(provider, 0)
+                if provider in CALL_PROVIDERS:
+                    sessions += reserved
+                if sessions >= limit:
+                    return f"{provider} sessions {sessions} >= {limit}"
+
+        return None
+
+    def reject(self, reason: str):
+        self.registry.incr_counter("rejected_calls")
+        self.registry.incr_counter(f"rejected_calls:{reason.split()[0]}")
+
+    def stats(self) -> dict:
+        return {
+            "active_calls": self.registry.active_calls(),
+            "reserved_calls": self.registry.reserved_calls(),
+            "provider_calls": self.registry.provider_calls(),
+            "loop_lag": self.loop_lag.stats(),
+            "counters": self.registry.counters(),
+            "limits": self.limits.model_dump(),
+        }
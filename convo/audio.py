@@ -0,0 +1,91 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Telephony audio path for Twilio media streams.
+
+Twilio speaks 8 kHz G.711 mu-law. Running the pipeline's output at 8 kHz as
+well means ElevenLabs generates audio at the phone's native rate and nothing
+has to be resampled; what's left is the mu-law conversion, done here with
+table lookups over whole frames instead of per-sample Python or audioop calls.
+Frames at any other rate go through pipecat's regular resampling path.
+"""
+
+import base64
+import json
+
+import numpy as np
+
+from pipecat.frames.frames import AudioRawFrame, InputAudioRawFrame
+from pipecat.serializers.twilio import TwilioFrameSerializer
+
+TELEPHONY_SAMPLE_RATE = 8000
+
+
+def _build_decode_table() -> np.ndarray:
+    ulaw = ~np.arange(256, dtype=np.uint8)
+    exponent = (ulaw >> 4) & 0x07
+    mantissa = (ulaw & 0x0F).astype(np.int32)
+    magnitude = (((mantissa << 3) + 0x84) << exponent) - 0x84
+    return np.where(ulaw & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+def _build_encode_table() -> np.ndarray:
+    # One entry per possible 16-bit sample, indexed by its unsigned bit
+    # pattern. Same G.711 segment encoding as audioop, which pipecat uses.
+    samples = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(samples < 0, 0x7F, 0xFF)
+    magnitude = np.abs(samples) + 0x21
+    segment = np.searchsorted(
+        np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]), magnitude
+    )
+    ulaw = (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+    # Magnitudes past the last segment clip to full scale.
+    ulaw = np.where(segment >= 8, 0x7F, ulaw)
+    return (ulaw ^ mask).astype(np.uint8)
+
+
+_DECODE_TABLE = _build_decode_table()
+_ENCODE_TABLE = _build_encode_table()
+
+
+def ulaw_to_pcm16(data: bytes) -> bytes:
+    return _DECODE_TABLE[np.frombuffer(data, dtype=np.uint8)].tobytes()
+
+
+def pcm16_to_ulaw(data: bytes) -> bytes:
+    return _ENCODE_TABLE[np.frombuffer(data, dtype=np.uint16)].tobytes()
+
+
+class TelephonyTwilioFrameSerializer(TwilioFrameSerializer):
+    """Twilio serializer with a no-resample fast path for 8 kHz audio."""
+
+    async def serialize(self, frame):
+        if (
+            isinstance(frame, AudioRawFrame)
+            and frame.sample_rate == self._twilio_sample_rate
+        ):
+            payload = base64.b64encode(pcm16_to_ulaw(frame.audio)).decode("utf-8")
+            return json.dumps(
+                {
+                    "event": "media",
+                    "streamSid": self._stream_sid,
+                    "media": {"payload": payload},
+                }
+            )
+        return await super().serialize(frame)
+
+    async def deserialize(self, data):
+        if self._sample_rate != self._twilio_sample_rate:
+            return await super().deserialize(data)
+        message = json.loads(data)
+        if message["event"] != "media":
+            return await super().deserialize(data)
+        payload = base64.b64decode(message["media"]["payload"])
+        return InputAudioRawFrame(
+            audio=ulaw_to_pcm16(payload),
+            num_channels=1,
+            sample_rate=self._sample_rate,
+        )
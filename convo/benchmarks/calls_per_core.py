@@ -0,0 +1,178 @@
+"""Measure how many concurrent calls the convo server sustains per CPU core.
+
+Starts `server.py` against the same local stand-ins for OpenAI, Deepgram and
+ElevenLabs as `benchmarks/soak.py`, and plays simulated Twilio calls into
+`/ws`, so every call runs the real pipeline: the Twilio serializer, Silero
+VAD, the STT, LLM and TTS services and the output transport. A worker is
+"keeping up" while the p99 event-loop lag it reports on `/admin/loop-lag`
+(the measurement `CONVO_MAX_LOOP_LAG_MS` admission control uses) stays under
+the budget.
+
+The benchmark first finds how many calls a single worker sustains, then
+starts the server with `--workers N` and runs N times that many calls, to
+measure what the multi-worker mode buys on this machine. The simulated
+callers and the stand-ins run in this process and take CPU time too, so on
+a small machine leave them a core.
+
+    python benchmarks/calls_per_core.py --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from soak import (
+    get_json,
+    load_seed_audio,
+    simulated_call,
+    start_fake_providers,
+    start_server,
+    stop_server,
+    wait_until_idle,
+)
+
+# LoopLagMonitor keeps the last 300 samples, taken every 100ms.
+LAG_WINDOW_SECS = 30.0
+# How long to keep asking for every worker's loop lag.
+POLL_SECS = 10.0
+
+
+async def worker_lags(port: int, workers: int) -> Dict[int, float]:
+    """p99 loop lag of each worker, asking until every worker has answered.
+
+    Workers share the listening socket, and whichever is idle when a request
+    arrives takes it, so a busy worker may only answer a few in a hundred.
+    """
+    lags = {}
+    deadline = time.perf_counter() + POLL_SECS
+    while len(lags) < workers and time.perf_counter() < deadline:
+        stats = await asyncio.to_thread(get_json, port, "/admin/loop-lag")
+        lags[stats["pid"]] = stats["p99_ms"] / 1000
+        await asyncio.sleep(0.02)
+    return lags
+
+
+async def measure(port: int, workers: int, calls: int, seed: bytes, args) -> float:
+    """Run `calls` calls at once; return the worst worker's p99 loop lag.
+
+    The lag is read while the calls are still running, once the window it
+    covers no longer includes the calls starting up.
+    """
+    call_secs = args.ramp_secs + LAG_WINDOW_SECS + POLL_SECS + 5.0
+    tasks = [
+        asyncio.create_task(simulated_call(port, seed, call_secs))
+        for _ in range(calls)
+    ]
+    await asyncio.sleep(args.ramp_secs + LAG_WINDOW_SECS)
+    lags = await worker_lags(port, workers)
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    await wait_until_idle(port)
+
+    failed = [r for r in results if isinstance(r, Exception)]
+    if failed:
+        sys.exit(f"{len(failed)} of {calls} calls failed: {failed[0]!r}")
+    if not any(results):
+        sys.exit("no call got audio back from the bot")
+    if len(lags) < workers:
+        print(f"  only {len(lags)} of {workers} workers answered /admin/loop-lag")
+    lag = max(lags.values())
+    if args.verbose:
+        print(f"  {calls} calls: p99 loop lag {lag * 1000:.1f}ms")
+    return lag
+
+
+async def find_capacity(port: int, seed: bytes, budget: float, args) -> int:
+    calls = 1
+    while calls * 2 <= args.max_calls and (
+        await measure(port, 1, calls * 2, seed, args) < budget
+    ):
+        calls *= 2
+    lo, hi = calls, min(calls * 2, args.max_calls + 1)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if await measure(port, 1, mid, seed, args) < budget:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+async def run(args):
+    budget = args.lag_budget_ms / 1000
+    cores = min(args.workers, os.cpu_count())
+    seed = load_seed_audio()
+    env = {"CONVO_AUDIO_OUT": args.audio_out}
+    fake, fake_task, fake_port = await start_fake_providers()
+
+    async def serve(workers: int, tmp: str):
+        proc, port, log = await start_server(tmp, fake_port, workers, **env)
+        # Each worker loads pipecat and the VAD model on its first calls.
+        await asyncio.gather(
+            *(simulated_call(port, seed, args.ramp_secs) for _ in range(workers * 2))
+        )
+        await wait_until_idle(port)
+        return proc, port, log
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            proc, port, log = await serve(1, tmp)
+            try:
+                single = await find_capacity(port, seed, budget, args)
+            finally:
+                stop_server(proc, log)
+        print(f"1 worker:  {single} calls  ({single} calls/core, 1 core in use)")
+
+        total = single * args.workers
+        with tempfile.TemporaryDirectory() as tmp:
+            proc, port, log = await serve(args.workers, tmp)
+            try:
+                lag = await measure(port, args.workers, total, seed, args)
+            finally:
+                stop_server(proc, log)
+        status = "ok" if lag < budget else f"over budget, p99 lag {lag * 1000:.1f}ms"
+        print(
+            f"{args.workers} workers: {total} calls  "
+            f"({total / cores:.1f} calls/core, {cores} cores in use) [{status}]"
+        )
+    finally:
+        fake.should_exit = True
+        await fake_task
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--ramp-secs",
+        type=float,
+        default=10.0,
+        help="how long calls run before the lag window starts",
+    )
+    parser.add_argument(
+        "--lag-budget-ms",
+        type=float,
+        default=50.0,
+        help="p99 event-loop lag a worker may reach and still count as keeping up",
+    )
+    parser.add_argument(
+        "--max-calls",
+        type=int,
+        default=64,
+        help="stop searching for a single worker's capacity here",
+    )
+    parser.add_argument(
+        "--audio-out",
+        choices=["telephony", "wideband"],
+        default="telephony",
+        help="output audio mode, as in CONVO_AUDIO_OUT",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,567 @@
+"""Soak test the convo server for leaks across many calls.
+
+Starts `server.py` against local stand-ins for OpenAI, Deepgram and
+ElevenLabs, then plays hundreds of simulated Twilio calls into `/ws` in
+rounds, `--concurrency` at a time. Each simulated call streams a seed
+recording from twilio/recordings as the caller's voice and reads back the
+bot's audio. After every round the harness waits for the server to go idle
+and reads its resident memory, open file descriptors and live object counts
+(after a full collection) from `/admin/process`.
+
+The first round warms up caches and connection pools and is not counted.
+Exits non-zero if memory, descriptors or objects grow past their budgets
+between the end of the warm-up and the last round, so it can gate running
+with `CONVO_FORCE_GC=0`. Memory growth is the trend of RSS across the rounds
+after the warm-up, since single readings are noisy:
+
+    python benchmarks/soak.py --calls 300 --concurrency 10 --no-force-gc
+
+Linux only (descriptor and RSS readings come from /proc).
+"""
+
+import argparse
+import asyncio
+import base64
+import glob
+import json
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+import wave
+from pathlib import Path
+
+import numpy as np
+import uvicorn
+import websockets
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from starlette.requests import ClientDisconnect
+from starlette.responses import Response, StreamingResponse
+
+CONVO_DIR = Path(__file__).resolve().parent.parent
+WORKSPACE_ROOT = CONVO_DIR.parent
+SEED_GLOB = str(WORKSPACE_ROOT / "twilio" / "recordings" / "*.wav")
+
+SOAK_NUMBER = "15555550100"
+ADMIN_TOKEN = uuid.uuid4().hex
+FRAME_SECS = 0.02
+FRAME_SAMPLES = 160  # 20ms at 8 kHz
+
+BOT_REPLY = (
+    "Oh, you came, I'm so glad you came, really. "
+    "Everyone keeps saying I'm gone, but I'm right here. "
+    "You're not upset with me, are you?"
+)
+TRANSCRIPTS = [
+    "It's going fine, a little strange honestly.",
+    "No, I'm not upset with you.",
+    "Okay, maybe a little, sometimes.",
+    "I promise I won't leave.",
+]
+TTS_SECS_PER_CHAR = 0.06
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Local provider stand-ins
+
+
+def create_fake_providers() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        try:
+            body = await request.json()
+        except ClientDisconnect:
+            # The bot gave up on the request (interrupted, or the call ended).
+            return Response(status_code=499)
+        model = body.get("model", "gpt-4o")
+        include_usage = body.get("stream_options", {}).get("include_usage")
+
+        def chunk(choices, **extra):
+            message = {
+                "id": "chatcmpl-soak",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": choices,
+                **extra,
+            }
+            return f"data: {json.dumps(message)}\n\n"
+
+        async def stream():
+            for word in BOT_REPLY.split(" "):
+                await asyncio.sleep(0.02)
+                delta = {"role": "assistant", "content": word + " "}
+                yield chunk([{"index": 0, "delta": delta, "finish_reason": None}])
+            yield chunk([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            if include_usage:
+                usage = {
+                    "prompt_tokens": 1200,
+                    "completion_tokens": 30,
+                    "total_tokens": 1230,
+                    "prompt_tokens_details": {"cached_tokens": 1024},
+                }
+                yield chunk([], usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.websocket("/v1/listen")
+    async def deepgram_listen(websocket: WebSocket):
+        await websocket.accept()
+        # linear16 at the pipeline's input rate; one final transcript per
+        # ~2s of caller audio.
+        sample_rate = int(websocket.query_params.get("sample_rate", 8000))
+        bytes_per_transcript = sample_rate * 2 * 2
+        received = 0
+        sent = 0
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("text"):
+                    if json.loads(message["text"]).get("type") == "CloseStream":
+                        # Like Deepgram: flush, send the metadata and close
+                        # cleanly, so the client doesn't take it for a drop
+                        # and reconnect.
+                        await websocket.send_text(
+                            json.dumps(deepgram_metadata(received / (sample_rate * 2)))
+                        )
+                        await websocket.close()
+                        return
+                    continue
+                received += len(message.get("bytes") or b"")
+                if received >= (sent + 1) * bytes_per_transcript:
+                    transcript = TRANSCRIPTS[sent % len(TRANSCRIPTS)]
+                    await websocket.send_text(
+                        json.dumps(deepgram_result(transcript, sent * 2.0))
+                    )
+                    sent += 1
+        except WebSocketDisconnect:
+            pass
+
+    @app.websocket("/v1/text-to-speech/{voice_id}/stream-input")
+    async def elevenlabs_stream(websocket: WebSocket, voice_id: str):
+        await websocket.accept()
+        output_format = websocket.query_params.get("output_format", "pcm_16000")
+        sample_rate = int(output_format.split("_")[1])
+        try:
+            while True:
+                message = json.loads(await websocket.receive_text())
+                text = message.get("text", "")
+                if text.strip():
+                    for audio in fake_speech(text, sample_rate):
+                        await websocket.send_text(json.dumps({"audio": audio}))
+                if message.get("flush") or text == "":
+                    await websocket.send_text(json.dumps({"isFinal": True}))
+        except WebSocketDisconnect:
+            pass
+
+    return app
+
+
+def deepgram_metadata(duration: float) -> dict:
+    return {
+        "type": "Metadata",
+        "transaction_key": "deprecated",
+        "request_id": str(uuid.uuid4()),
+        "sha256": "",
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        "duration": duration,
+        "channels": 1,
+    }
+
+
+def deepgram_result(transcript: str, start: float) -> dict:
+    return {
+        "type": "Results",
+        "channel_index": [0, 1],
+        "duration": 2.0,
+        "start": start,
+        "is_final": True,
+        "speech_final": True,
+        "from_finalize": False,
+        "channel": {
+            "alternatives": [
+                {"transcript": transcript, "confidence": 0.99, "words": []}
+            ]
+        },
+        "metadata": {
+            "request_id": str(uuid.uuid4()),
+            "model_info": {"name": "soak", "version": "0", "arch": "soak"},
+            "model_uuid": str(uuid.uuid4()),
+        },
+    }
+
+
+def fake_speech(text: str, sample_rate: int):
+    """Base64 PCM chunks of 100ms, as long as `text` would take to say."""
+    total = int(len(text) * TTS_SECS_PER_CHAR * sample_rate)
+    chunk_samples = sample_rate // 10
+    # A quiet square wave, 20 samples per period.
+    chunk = (b"\x00\x08" * 10 + b"\x00\xf8" * 10) * (chunk_samples // 20)
+    for offset in range(0, total, chunk_samples):
+        samples = min(chunk_samples, total - offset)
+        yield base64.b64encode(chunk[: samples * 2]).decode("utf-8")
+
+
+# Simulated Twilio calls
+
+
+def load_seed_audio() -> bytes:
+    """8 kHz mu-law caller audio from the recorded voicemail answers."""
+    sys.path.insert(0, str(CONVO_DIR))
+    from audio import TELEPHONY_SAMPLE_RATE, pcm16_to_ulaw
+
+    ulaw = b""
+    for path in sorted(glob.glob(SEED_GLOB)):
+        with wave.open(path) as wf:
+            if wf.getsampwidth() not in (1, 2):
+                sys.exit(f"{path}: unsupported sample width {wf.getsampwidth()}")
+            raw = wf.readframes(wf.getnframes())
+            # 8-bit WAV is unsigned.
+            if wf.getsampwidth() == 1:
+                pcm = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) * 256
+            else:
+                pcm = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+            pcm = pcm.reshape(-1, wf.getnchannels()).mean(axis=1)
+            if wf.getframerate() != TELEPHONY_SAMPLE_RATE:
+                # Linear interpolation is plenty for a stand-in caller.
+                times = np.arange(len(pcm)) / wf.getframerate()
+                out = np.arange(0, times[-1], 1 / TELEPHONY_SAMPLE_RATE)
+                pcm = np.interp(out, times, pcm)
+        ulaw += pcm16_to_ulaw(pcm.astype(np.int16).tobytes())
+    if not ulaw:
+        sys.exit(f"no seed recordings found in {SEED_GLOB}")
+    return ulaw
+
+
+async def simulated_call(port: int, seed: bytes, call_secs: float) -> int:
+    """Play one call into the server; return how many bytes of audio came back."""
+    stream_sid = f"MZ{uuid.uuid4().hex}"
+    call_sid = f"CA{uuid.uuid4().hex}"
+    frames = int(call_secs / FRAME_SECS)
+    offset = random.randrange(len(seed))
+    received = 0
+
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws") as ws:
+
+        async def read():
+            nonlocal received
+            async for message in ws:
+                data = json.loads(message)
+                if data.get("event") == "media":
+                    received += len(base64.b64decode(data["media"]["payload"]))
+
+        reader = asyncio.create_task(read())
+        await ws.send(json.dumps({"event": "connected", "protocol": "Call"}))
+        await ws.send(
+            json.dumps(
+                {
+                    "event": "start",
+                    "streamSid": stream_sid,
+                    "start": {
+                        "streamSid": stream_sid,
+                        "callSid": call_sid,
+                        "mediaFormat": {
+                            "encoding": "audio/x-mulaw",
+                            "sampleRate": 8000,
+                            "channels": 1,
+                        },
+                    },
+                }
+            )
+        )
+        next_tick = time.perf_counter()
+        for i in range(frames):
+            start = (offset + i * FRAME_SAMPLES) % len(seed)
+            payload = seed[start : start + FRAME_SAMPLES]
+            payload += seed[: FRAME_SAMPLES - len(payload)]
+            await ws.send(
+                json.dumps(
+                    {
+                        "event": "media",
+                        "streamSid": stream_sid,
+                        "media": {
+                            "chunk": str(i),
+                            "timestamp": str(int(i * FRAME_SECS * 1000)),
+                            "payload": base64.b64encode(payload).decode("utf-8"),
+                        },
+                    }
+                )
+            )
+            next_tick += FRAME_SECS
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+        await ws.send(json.dumps({"event": "stop", "streamSid": stream_sid}))
+        reader.cancel()
+    return received
+
+
+# Server under test
+
+
+def create_catalog(path: str):
+    sys.path.insert(0, str(WORKSPACE_ROOT / "data_processing"))
+    from catalog import QUESTIONS, CallerCatalog
+
+    catalog = CallerCatalog(path)
+    catalog.upsert_caller(SOAK_NUMBER, "Sam", "soak-voice")
+    for question in QUESTIONS:
+        catalog.add_recording(SOAK_NUMBER, question, file_path=f"{question}.wav")
+        catalog.set_transcript(SOAK_NUMBER, question, f"My {question} answer.")
+    catalog.close()
+
+
+def get_json(port: int, path: str) -> dict:
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}{path}", headers={"X-Admin-Token": ADMIN_TOKEN}
+    )
+    with urllib.request.urlopen(request, timeout=30) as r:
+        return json.load(r)
+
+
+async def wait_until_idle(port: int, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        stats = await asyncio.to_thread(get_json, port, "/stats")
+        if stats["active_calls"] == 0:
+            return
+        await asyncio.sleep(0.5)
+    sys.exit("server still has active calls after the round ended")
+
+
+async def wait_for_port(port: int, proc: subprocess.Popen, timeout: float):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.05):
+                return True
+        except OSError:
+            await asyncio.sleep(0.05)
+    return False
+
+
+def top_growth(baseline: dict, current: dict, limit: int = 5) -> str:
+    growth = {
+        name: count - baseline.get(name, 0)
+        for name, count in current.items()
+        if count > baseline.get(name, 0)
+    }
+    ranked = sorted(growth.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return ", ".join(f"{name} +{count}" for name, count in ranked) or "-"
+
+
+async def start_fake_providers():
+    """Serve the provider stand-ins in this process; return (server, task, port)."""
+    port = free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_fake_providers(), host="127.0.0.1", port=port, log_level="error"
+        )
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task, port
+
+
+async def start_server(tmp: str, fake_port: int, workers: int = 1, **env):
+    """Start `server.py` against the stand-ins; return (process, port, log).
+
+    `env` adds environment variables (e.g. `CONVO_FORCE_GC="0"`). Exits if
+    the server doesn't start accepting connections.
+    """
+    catalog_path = os.path.join(tmp, "catalog.sqlite3")
+    create_catalog(catalog_path)
+    recordings = os.path.join(tmp, "recordings")
+    os.makedirs(recordings)
+    port = free_port()
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "soak",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "DEEPGRAM_API_KEY": "soak",
+        "DEEPGRAM_API_URL": f"http://127.0.0.1:{fake_port}",
+        "ELEVENLABS_API_KEY": "soak",
+        "ELEVENLABS_WS_URL": f"ws://127.0.0.1:{fake_port}",
+        "CALLER_CATALOG": catalog_path,
+        "CONVO_STATE_DB": os.path.join(tmp, "state.sqlite3"),
+        "CONVO_RECORDING_DIR": recordings,
+        "CONVO_ADMIN_TOKEN": ADMIN_TOKEN,
+        **env,
+    }
+    log = open(os.path.join(tmp, "server.log"), "w+")
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "server.py",
+            "-n",
+            SOAK_NUMBER,
+            "-p",
+            str(port),
+            "-w",
+            str(workers),
+        ],
+        cwd=CONVO_DIR,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    if not await wait_for_port(port, proc, 30):
+        log.seek(0)
+        print(log.read()[-4000:])
+        stop_server(proc, log)
+        sys.exit("server did not start")
+    return proc, port, log
+
+
+def stop_server(proc: subprocess.Popen, log):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        # Stuck calls keep uvicorn waiting on their tasks.
+        proc.kill()
+        proc.wait()
+    log.close()
+
+
+async def soak(args, tmp: str) -> list:
+    fake, fake_task, fake_port = await start_fake_providers()
+    seed = load_seed_audio()
+    samples = []
+    try:
+        proc, port, log = await start_server(
+            tmp, fake_port, CONVO_FORCE_GC="1" if args.force_gc else "0"
+        )
+        try:
+            await run_rounds(args, port, seed, samples)
+        finally:
+            stop_server(proc, log)
+    finally:
+        fake.should_exit = True
+        await fake_task
+    return samples
+
+
+async def run_rounds(args, port: int, seed: bytes, samples: list):
+    """Play the soak's rounds of calls, appending a sample after each."""
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one_call():
+        async with semaphore:
+            return await simulated_call(port, seed, args.call_secs)
+
+    # The first round is the warm-up, so there are always at least two.
+    rounds = max(2, math.ceil(args.calls / args.calls_per_round))
+    done = 0
+    for round_number in range(rounds):
+        calls = max(1, min(args.calls_per_round, args.calls - done))
+        results = await asyncio.gather(
+            *(one_call() for _ in range(calls)), return_exceptions=True
+        )
+        failed = [r for r in results if isinstance(r, Exception)]
+        silent = sum(1 for r in results if r == 0)
+        done += calls
+        await wait_until_idle(port)
+        await asyncio.sleep(args.settle_secs)
+        sample = await asyncio.to_thread(
+            get_json, port, "/admin/process?collect=true&limit=200"
+        )
+        sample.update(calls=done, failed=len(failed), silent=silent)
+        samples.append(sample)
+
+        baseline = samples[0]
+        label = "warm-up" if round_number == 0 else f"round {round_number}"
+        print(
+            f"{label:>9}: {done:5d} calls  "
+            f"rss {sample['rss_bytes'] / 2**20:7.1f} MB  "
+            f"fds {sample['open_fds']:4d}  objects {sample['objects']:8d}  "
+            f"failed {len(failed)}  silent {silent}  "
+            f"growth: {top_growth(baseline['top_objects'], sample['top_objects'])}"
+        )
+        if failed and args.verbose:
+            print(f"  first failure: {failed[0]!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--calls-per-round", type=int, default=30)
+    parser.add_argument("-c", "--concurrency", type=int, default=10)
+    parser.add_argument("--call-secs", type=float, default=6.0)
+    parser.add_argument("--settle-secs", type=float, default=2.0)
+    parser.add_argument(
+        "--force-gc",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="run the server with CONVO_FORCE_GC on (the default) or off",
+    )
+    parser.add_argument("--max-rss-growth-mb", type=float, default=32.0)
+    parser.add_argument("--max-fd-growth", type=int, default=4)
+    parser.add_argument(
+        "--max-objects-per-call",
+        type=float,
+        default=10.0,
+        help="live objects each call may leave behind, on average",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        samples = asyncio.run(soak(args, tmp))
+
+    baseline, last = samples[0], samples[-1]
+    calls = last["calls"] - baseline["calls"]
+    counted = samples[1:]
+    if len(counted) >= 2:
+        # RSS moves by several MB from round to round as the allocator
+        # reuses memory, so use its trend across the counted rounds.
+        slope, _ = statistics.linear_regression(
+            [sample["calls"] for sample in counted],
+            [sample["rss_bytes"] for sample in counted],
+        )
+        rss_growth = slope * calls / 2**20
+    else:
+        rss_growth = (last["rss_bytes"] - baseline["rss_bytes"]) / 2**20
+    fd_growth = last["open_fds"] - baseline["open_fds"]
+    objects_per_call = (last["objects"] - baseline["objects"]) / calls
+    print(
+        f"after warm-up: {calls} calls, rss {rss_growth:+.1f} MB, "
+        f"fds {fd_growth:+d}, objects {objects_per_call:+.1f}/call"
+    )
+
+    failures = []
+    failed = sum(sample["failed"] for sample in samples)
+    if failed:
+        failures.append(f"{failed} calls failed (rerun with -v)")
+    if sum(sample["silent"] for sample in samples) == last["calls"]:
+        failures.append("no call got audio back from the bot")
+    if rss_growth > args.max_rss_growth_mb:
+        failures.append(f"RSS grew {rss_growth:.1f} MB")
+    if fd_growth > args.max_fd_growth:
+        failures.append(f"{fd_growth} file descriptors leaked")
+    if objects_per_call > args.max_objects_per_call:
+        failures.append(f"{objects_per_call:.1f} objects leaked per call")
+    if failures:
+        sys.exit("soak failed: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
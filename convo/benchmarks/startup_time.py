@@ -0,0 +1,115 @@
+"""Measure how long the convo server takes to start accepting connections.
+
+Starts `server.py` under `python -X importtime`, polls until its port accepts
+a TCP connection, then prints the cold-start time and the slowest imports on
+the way there. Exits non-zero when startup is over budget, so it can gate
+changes that add import-time work.
+
+    python benchmarks/startup_time.py --budget 1.0
+"""
+
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CONVO_DIR = Path(__file__).resolve().parent.parent
+
+# Target for `python server.py` to bind its port. Service imports happen in
+# the background after that point and don't count.
+DEFAULT_BUDGET_SECS = 1.0
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def wait_for_port(port: int, proc: subprocess.Popen, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.05):
+                return True
+        except OSError:
+            time.sleep(0.01)
+    return False
+
+
+def top_imports(log: str, limit: int):
+    """Top-level imports (as seen from server.py) by cumulative time."""
+    entries = []
+    for line in log.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) <= 1:
+            entries.append((int(match.group(2)), match.group(4)))
+    return sorted(entries, reverse=True)[:limit]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    times = []
+    log = ""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "CONVO_STATE_DB": os.path.join(tmp, "state.sqlite3")}
+        for _ in range(args.runs):
+            port = free_port()
+            stderr = open(os.path.join(tmp, "importtime.log"), "w+")
+            start = time.perf_counter()
+            proc = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-X",
+                    "importtime",
+                    "server.py",
+                    "-n",
+                    "0",
+                    "-p",
+                    str(port),
+                ],
+                cwd=CONVO_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=stderr,
+            )
+            ready = wait_for_port(port, proc, args.timeout)
+            elapsed = time.perf_counter() - start
+            proc.terminate()
+            proc.wait()
+            stderr.seek(0)
+            log = stderr.read()
+            stderr.close()
+            if not ready:
+                print(log[-2000:])
+                sys.exit("server did not start")
+            times.append(elapsed)
+
+    print(f"time to accept connections: {min(times):.2f}s best of {args.runs}")
+    # The log runs until the server is stopped, so it also covers the
+    # background service preload that starts once the port is bound.
+    print("slowest top-level imports, including background preload (last run):")
+    for micros, name in top_imports(log, args.top):
+        print(f"  {micros / 1e6:7.3f}s  {name}")
+
+    if min(times) > args.budget:
+        sys.exit(f"over startup budget of {args.budget:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Runtime health measurements for the convo server."""
+
+import asyncio
+import collections
+import collections.abc
+import contextvars
+import cProfile
+import gc
+import io
+import os
+import pstats
+import shutil
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from loguru import logger
+
+PROFILE_DIR = os.getenv("CONVO_PROFILE_DIR", "output/profiles")
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes up a sleeping task.
+
+    Every `interval` seconds the monitor schedules a sleep and records how far
+    past the deadline it actually resumed. A busy loop (VAD inference, audio
+    conversion, JSON serialization) shows up here long before it shows up as
+    choppy audio on the call.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 300):
+        self.interval = interval
+        self._samples = collections.deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            self._samples.append(max(0.0, lag))
+            if lag > 0.25:
+                logger.warning(f"Event loop lag {lag * 1000:.0f}ms")
+
+    @property
+    def current(self) -> float:
+        return self._samples[-1] if self._samples else 0.0
+
+    def percentile(self, p: float) -> float:
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def stats(self) -> dict:
+        return {
+            "current_ms": round(self.current * 1000, 2),
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "max_ms": round(max(self._samples, default=0.0) * 1000, 2),
+            "samples": len(self._samples),
+        }
+
+
+# Per-call accounting
+#
+# Pipecat runs each call as a tree of asyncio tasks. Every task created while a
+# call is being served inherits the `current_call` context variable, so a task
+# factory can wrap those tasks and charge the CPU time of each step (the code
+# run between two awaits) to the call. The same hook turns cProfile on only
+# while that one call's code is running, which keeps other calls sharing the
+# loop out of the profile.
+
+current_call: contextvars.ContextVar[Optional["CallStats"]] = contextvars.ContextVar(
+    "current_call", default=None
+)
+
+
+class CallStats:
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        self.started_at = time.time()
+        self.ended_at: Optional[float] = None
+        self.cpu_time = 0.0
+        self.steps = 0
+        self.tasks = 0
+        self.profiler: Optional[cProfile.Profile] = None
+
+    def to_dict(self) -> dict:
+        end = self.ended_at or time.time()
+        return {
+            "call_id": self.call_id,
+            "active": self.ended_at is None,
+            "wall_secs": round(end - self.started_at, 3),
+            "cpu_secs": round(self.cpu_time, 4),
+            "steps": self.steps,
+            "tasks": self.tasks,
+            "profiling": self.profiler is not None,
+        }
+
+
+class _MeteredCoroutine(collections.abc.Coroutine):
+    """Wraps a task's coroutine to time (and optionally profile) each step."""
+
+    def __init__(self, coro, stats: CallStats):
+        self._coro = coro
+        self._stats = stats
+
+    def _step(self, method, *args):
+        stats = self._stats
+        profiler = stats.profiler
+        if profiler:
+            profiler.enable()
+        start = time.thread_time()
+        try:
+            return method(*args)
+        finally:
+            stats.cpu_time += time.thread_time() - start
+            stats.steps += 1
+            if profiler:
+                profiler.disable()
+
+    def send(self, value):
+        return self._step(self._coro.send, value)
+
+    def throw(self, *args):
+        return self._step(self._coro.throw, *args)
+
+    def close(self):
+        return self._coro.close()
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def __getattr__(self, name):
+        # Keep names and frames visible to asyncio's repr and debugging tools.
+        return getattr(self._coro, name)
+
+
+class CallProfiler:
+    def __init__(self, keep_finished: int = 50):
+        self.calls: Dict[str, CallStats] = {}
+        self._finished = collections.deque(maxlen=keep_finished)
+        # Captures armed for calls that haven't started, and profile results.
+        # Both are keyed by caller-supplied call ids, so only the most recent
+        # `keep_finished` of each are kept.
+        self._keep = keep_finished
+        self._armed: collections.OrderedDict = collections.OrderedDict()
+        self.results: collections.OrderedDict = collections.OrderedDict()
+
+    def install(self, loop: asyncio.AbstractEventLoop):
+        previous = loop.get_task_factory()
+
+        def factory(loop, coro, **kwargs):
+            context = kwargs.get("context")
+            stats = context.get(current_call) if context else current_call.get()
+            if stats is not None and asyncio.iscoroutine(coro):
+                stats.tasks += 1
+                coro = _MeteredCoroutine(coro, stats)
+            if previous is not None:
+                return previous(loop, coro, **kwargs)
+            return asyncio.Task(coro, loop=loop, **kwargs)
+
+        loop.set_task_factory(factory)
+
+    @contextmanager
+    def track(self, call_id: str):
+        """Attribute every task created inside this block to `call_id`."""
+        stats = CallStats(call_id)
+        self.calls[call_id] = stats
+        token = current_call.set(stats)
+        armed = self._armed.pop(call_id, None)
+        if armed:
+            self._start_capture(stats, armed)
+        try:
+            yield stats
+        finally:
+            current_call.reset(token)
+            stats.ended_at = time.time()
+            if stats.profiler:
+                self._finish_cprofile(stats)
+            self.calls.pop(call_id, None)
+            self._finished.append(stats)
+
+    def stats(self) -> list:
+        return [s.to_dict() for s in [*self.calls.values(), *self._finished]]
+
+    # Capture triggers
+
+    def capture(self, call_id: str, mode: str = "cprofile", duration: int = 30) -> dict:
+        """Profile one call, now if it is running here or as soon as it starts."""
+        options = {"mode": mode, "duration": duration}
+        stats = self.calls.get(call_id)
+        if stats is None:
+            self._remember(self._armed, call_id, options)
+            return {"call_id": call_id, "status": "armed", **options}
+        self._start_capture(stats, options)
+        return {"call_id": call_id, "status": "capturing", **options}
+
+    def _remember(self, entries: collections.OrderedDict, call_id: str, value):
+        entries[call_id] = value
+        entries.move_to_end(call_id)
+        while len(entries) > self._keep:
+            entries.popitem(last=False)
+
+    def _start_capture(self, stats: CallStats, options: dict):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if options["mode"] == "pyspy":
+            result = self._start_pyspy(stats, options["duration"])
+            self._remember(self.results, stats.call_id, result)
+        else:
+            stats.profiler = cProfile.Profile()
+            result = {"mode": "cprofile", "status": "capturing"}
+            self._remember(self.results, stats.call_id, result)
+
+    def _finish_cprofile(self, stats: CallStats):
+        path = os.path.join(PROFILE_DIR, f"{stats.call_id}.prof")
+        stats.profiler.dump_stats(path)
+        out = io.StringIO()
+        try:
+            pstats.Stats(stats.profiler, stream=out).sort_stats(
+                "cumulative"
+            ).print_stats(30)
+        except TypeError:
+            # pstats refuses a profile that never saw a function call.
+            out.write("no samples")
+        stats.profiler = None
+        result = {
+            "mode": "cprofile",
+            "status": "done",
+            "path": path,
+            "top": out.getvalue(),
+        }
+        self._remember(self.results, stats.call_id, result)
+        logger.info(f"Profile for call {stats.call_id} saved to {path}")
+
+    def _start_pyspy(self, stats: CallStats, duration: int) -> dict:
+        # py-spy samples the whole worker process, not just this call.
+        if shutil.which("py-spy") is None:
+            return {"mode": "pyspy", "status": "error", "error": "py-spy not installed"}
+        path = os.path.join(PROFILE_DIR, f"{stats.call_id}.svg")
+        subprocess.Popen(
+            [
+                "py-spy",
+                "record",
+                "--pid",
+                str(os.getpid()),
+                "--duration",
+                str(duration),
+                "--output",
+                path,
+            ]
+        )
+        return {"mode": "pyspy", "status": "capturing", "path": path}
+
+    def result(self, call_id: str) -> Optional[dict]:
+        return self.results.get(call_id)
+
+
+# Allocation snapshots
+
+
+class AllocationTracker:
+    def __init__(self):
+        self._last: Optional[tracemalloc.Snapshot] = None
+
+    def start(self, frames: int = 10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._last = None
+
+    def stop(self):
+        tracemalloc.stop()
+        self._last = None
+
+    def snapshot(self, limit: int = 20) -> dict:
+        """Top allocation sites, plus growth since the previous snapshot."""
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        result = {
+            "tracing": True,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [str(s) for s in snapshot.statistics("lineno")[:limit]],
+        }
+        if self._last is not None:
+            result["growth"] = [
+                str(s) for s in snapshot.compare_to(self._last, "lineno")[:limit]
+            ]
+        self._last = snapshot
+        return result
+
+
+def process_stats(collect: bool = False, limit: int = 20) -> dict:
+    """Resident memory, open file descriptors and live objects by type.
+
+    With `collect`, runs a full garbage collection first, so the numbers show
+    what is actually still referenced rather than what the collector hasn't
+    got to yet.
+    """
+    if collect:
+        gc.collect()
+    counts = collections.Counter(type(obj).__name__ for obj in gc.get_objects())
+    return {
+        "rss_bytes": _rss_bytes(),
+        "open_fds": _open_fds(),
+        "objects": sum(counts.values()),
+        "top_objects": dict(counts.most_common(limit)),
+        "gc_counts": gc.get_count(),
+    }
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def _open_fds() -> Optional[int]:
+    for fd_dir in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(fd_dir):
+            return len(os.listdir(fd_dir))
+    return None
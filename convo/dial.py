@@ -1,10 +1,13 @@
 import os
 import argparse
+import urllib.request
 from twilio.rest import Client
 from dotenv import load_dotenv
 
+from registry import CallRegistry
 
-def make_call(to_number: str):
+
+def make_call(to_number: str, profile_number: str = None):
     load_dotenv(override=True)
 
     account_sid = os.getenv("TWILIO_ACCOUNT_SID")
@@ -21,6 +24,19 @@ def make_call(to_number: str):
 
     print(f"Call initiated with SID: {call.sid}")
 
+    # Tell whichever server worker picks up the stream which profile to use.
+    CallRegistry().route_call(call.sid, profile_number or to_number)
+
+    # Let the server open the caller's TTS connection while the phone rings.
+    server_url = os.getenv("CONVO_SERVER_URL", "http://localhost:8765")
+    try:
+        request = urllib.request.Request(
+            f"{server_url}/prewarm/{call.sid}", method="POST"
+        )
+        urllib.request.urlopen(request, timeout=2).close()
+    except Exception as e:
+        print(f"Could not prewarm call {call.sid}: {e}")
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Make a phone call using Twilio")
@@ -28,6 +44,11 @@ if __name__ == "__main__":
         "phone_number",
         help="Phone number to call (in format +1XXXXXXXXXX)",
     )
+    parser.add_argument(
+        "-p",
+        "--profile",
+        help="number of the profile to speak with (defaults to the dialed number)",
+    )
 
     args = parser.parse_args()
-    make_call(args.phone_number)
+    make_call(args.phone_number, args.profile)
@@ -0,0 +1,179 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""TTS that races a backup provider when the primary is slow to start.
+
+Every sentence goes to the primary service first. If no audio has come back
+by the hedge deadline, the same text is sent to the secondary service as
+well, and whichever produces audio first is played; the other request is
+cancelled. Both wrapped services must be HTTP (generator-based) TTS services
+so their audio can be raced before it reaches the pipeline.
+"""
+
+import asyncio
+import time
+from typing import AsyncGenerator, Dict
+
+from loguru import logger
+
+from pipecat.frames.frames import (
+    ErrorFrame,
+    Frame,
+    StartFrame,
+    TTSAudioRawFrame,
+    TTSStartedFrame,
+    TTSStoppedFrame,
+)
+from pipecat.services.ai_services import TTSService
+
+from metrics import hedge_counts, ttfb_stats
+
+_DONE = object()
+_FAILED = object()
+
+
+class HedgedTTSService(TTSService):
+    def __init__(
+        self,
+        *,
+        primary: TTSService,
+        secondary: TTSService,
+        primary_name: str = "primary",
+        secondary_name: str = "secondary",
+        hedge_after_secs: float = 0.8,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._services = {primary_name: primary, secondary_name: secondary}
+        self._primary_name = primary_name
+        self._secondary_name = secondary_name
+        self._hedge_after_secs = hedge_after_secs
+
+    def can_generate_metrics(self) -> bool:
+        return True
+
+    async def setup(self, setup):
+        await super().setup(setup)
+        for service in self._services.values():
+            await service.setup(setup)
+
+    async def start(self, frame: StartFrame):
+        await super().start(frame)
+        for service in self._services.values():
+            await service.start(frame)
+
+    async def stop(self, frame):
+        await super().stop(frame)
+        for service in self._services.values():
+            await service.stop(frame)
+
+    async def cancel(self, frame):
+        await super().cancel(frame)
+        for service in self._services.values():
+            await service.cancel(frame)
+
+    async def cleanup(self):
+        await super().cleanup()
+        for service in self._services.values():
+            await service.cleanup()
+
+    async def _pump(self, name: str, text: str, queue: asyncio.Queue):
+        """Feed one provider's audio for `text` into `queue`."""
+        start = time.perf_counter()
+        first = True
+        try:
+            async for frame in self._services[name].run_tts(text):
+                if isinstance(frame, ErrorFrame):
+                    logger.warning(f"{self}: {name} failed: {frame.error}")
+                    await queue.put(_FAILED)
+                    return
+                if isinstance(frame, TTSAudioRawFrame):
+                    if first:
+                        ttfb_stats[name].add(time.perf_counter() - start)
+                        first = False
+                    await queue.put(frame)
+        except asyncio.CancelledError:
+            if first:
+                ttfb_stats[name].add_censored(time.perf_counter() - start)
+            raise
+        except Exception as e:
+            logger.warning(f"{self}: {name} failed: {e}")
+            await queue.put(_FAILED)
+            return
+        await queue.put(_DONE)
+
+    async def _first_of(self, queues: Dict[str, asyncio.Queue]):
+        """Wait for the first audio from any provider still in `queues`."""
+        while queues:
+            getters = {
+                asyncio.create_task(queue.get()): name for name, queue in queues.items()
+            }
+            done, pending = await asyncio.wait(
+                getters, return_when=asyncio.FIRST_COMPLETED
+            )
+            for getter in pending:
+                getter.cancel()
+            # Prefer the primary when both answered in the same tick.
+            for getter in sorted(done, key=lambda g: getters[g] != self._primary_name):
+                name = getters[getter]
+                item = getter.result()
+                if item is _FAILED or item is _DONE:
+                    queues.pop(name)
+                    continue
+                return name, item
+        return None, None
+
+    async def run_tts(self, text: str) -> AsyncGenerator[Frame, None]:
+        logger.debug(f"{self}: Generating TTS [{text}]")
+        queues = {self._primary_name: asyncio.Queue()}
+        pumps = {
+            self._primary_name: asyncio.create_task(
+                self._pump(self._primary_name, text, queues[self._primary_name])
+            )
+        }
+        try:
+            await self.start_ttfb_metrics()
+            yield TTSStartedFrame()
+
+            primary_queue = queues[self._primary_name]
+            try:
+                first = await asyncio.wait_for(
+                    primary_queue.get(), timeout=self._hedge_after_secs
+                )
+            except asyncio.TimeoutError:
+                first = None
+
+            if first is not None and first is not _FAILED and first is not _DONE:
+                winner, frame = self._primary_name, first
+            else:
+                # Primary is slow (or already gave up): race the secondary.
+                if first is not None:
+                    queues.pop(self._primary_name)
+                hedge_counts[self._secondary_name] += 1
+                queues[self._secondary_name] = asyncio.Queue()
+                pumps[self._secondary_name] = asyncio.create_task(
+                    self._pump(self._secondary_name, text, queues[self._secondary_name])
+                )
+                winner, frame = await self._first_of(dict(queues))
+
+            await self.stop_ttfb_metrics()
+            if winner is None:
+                yield ErrorFrame(f"{self}: every TTS provider failed for [{text}]")
+                return
+            for name, pump in pumps.items():
+                if name != winner:
+                    pump.cancel()
+            if winner != self._primary_name:
+                logger.debug(f"{self}: {winner} won the hedge")
+
+            queue = queues[winner]
+            while frame is not _DONE and frame is not _FAILED:
+                yield frame
+                frame = await queue.get()
+            yield TTSStoppedFrame()
+        finally:
+            for pump in pumps.values():
+                pump.cancel()
@@ -0,0 +1,63 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Per-turn time to first audio."""
+
+import statistics
+import time
+from typing import List, Optional
+
+from loguru import logger
+
+from pipecat.frames.frames import (
+    BotStartedSpeakingFrame,
+    Frame,
+    StartInterruptionFrame,
+    UserStoppedSpeakingFrame,
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+
+
+class FirstAudioMonitor(FrameProcessor):
+    """Times each turn from the caller going quiet to the bot's first audio.
+
+    Goes after the transport output, where both the VAD's
+    UserStoppedSpeakingFrame and the output's BotStartedSpeakingFrame pass.
+    The time includes end-of-turn detection, STT, LLM and TTS.
+    """
+
+    def __init__(self, call_id: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._call_id = call_id
+        self._user_stopped: Optional[float] = None
+        self.delays: List[float] = []
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, UserStoppedSpeakingFrame):
+            self._user_stopped = time.perf_counter()
+        elif isinstance(frame, StartInterruptionFrame):
+            self._user_stopped = None
+        elif isinstance(frame, BotStartedSpeakingFrame) and self._user_stopped:
+            delay = time.perf_counter() - self._user_stopped
+            self._user_stopped = None
+            self.delays.append(delay)
+            logger.info(
+                f"Time to first audio for {self._call_id}: {delay * 1000:.0f}ms"
+            )
+
+        await self.push_frame(frame, direction)
+
+    def metrics(self) -> dict:
+        delays = self.delays
+        return {
+            "turns": len(delays),
+            "first_audio_ms_p50": (
+                round(statistics.median(delays) * 1000) if delays else None
+            ),
+            "first_audio_ms_max": round(max(delays) * 1000) if delays else None,
+        }
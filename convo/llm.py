@@ -0,0 +1,78 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""OpenAI LLM service that reports prompt caching and latency per turn.
+
+OpenAI caches the longest prompt prefix it has seen recently (from 1024
+tokens up) and bills and processes those tokens faster. This service logs,
+for every completion, how many prompt tokens were read from that cache and
+how long the first token took, so the effect of the prompt layout in
+`bot.get_flow_config` can be measured.
+
+The flow can also run each node on its own model: `enter_node` switches the
+model and tags the following turns with the node, and per-node latency and
+token totals are kept for the call and for the whole worker.
+"""
+
+import collections
+import time
+from typing import List, Optional
+
+from loguru import logger
+
+from pipecat.services.openai import OpenAILLMService
+
+from metrics import node_turns, summarize_turns
+
+
+class CacheReportingOpenAILLMService(OpenAILLMService):
+    def __init__(self, *, call_id: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._call_id = call_id
+        self._node: Optional[str] = None
+        self.turns: List[dict] = []
+
+    def enter_node(self, node: str, model: Optional[str] = None):
+        """Tag the following turns with `node`, switching to `model` if given."""
+        self._node = node
+        if model and model != self.model_name:
+            logger.debug(f"{self}: switching to {model} for node {node}")
+            self.set_model_name(model)
+
+    async def get_chat_completions(self, context, messages):
+        start = time.perf_counter()
+        chunks = await super().get_chat_completions(context, messages)
+        return self._observe(chunks, start)
+
+    async def _observe(self, chunks, start: float):
+        turn = {"node": self._node, "model": self.model_name, "ttft_ms": None}
+        async for chunk in chunks:
+            if turn["ttft_ms"] is None and chunk.choices:
+                turn["ttft_ms"] = round((time.perf_counter() - start) * 1000)
+            if chunk.usage:
+                details = chunk.usage.prompt_tokens_details
+                turn["prompt_tokens"] = chunk.usage.prompt_tokens
+                turn["cached_tokens"] = (details.cached_tokens or 0) if details else 0
+                turn["completion_tokens"] = chunk.usage.completion_tokens
+            yield chunk
+
+        self.turns.append(turn)
+        node_turns[(turn["node"], turn["model"])].append(turn)
+        logger.info(f"LLM turn for {self._call_id}: {turn}")
+
+    def usage_summary(self) -> dict:
+        by_node = collections.defaultdict(list)
+        for turn in self.turns:
+            by_node[turn["node"]].append(turn)
+        return {
+            **summarize_turns(self.turns),
+            "nodes": {node: summarize_turns(turns) for node, turns in by_node.items()},
+        }
+
+
+# pipecat-flows picks its LLM adapter by the service's class name, so the
+# subclass has to keep the name of the service it extends.
+CacheReportingOpenAILLMService.__name__ = OpenAILLMService.__name__
@@ -0,0 +1,95 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Latency and usage metrics shared by every call in a worker.
+
+The services record into these and `GET /stats` reads them. This module
+doesn't import pipecat, so serving the stats never waits on the service
+imports.
+"""
+
+import collections
+from typing import Dict, List, Optional
+
+
+class LatencyStats:
+    """Recent latencies, including censored ones.
+
+    A request cancelled before its first audio (the loser of a hedge) has no
+    latency of its own, only a lower bound: the time it had been waiting.
+    Leaving those out would drop exactly the slow requests and bias the
+    percentiles low, so they count at their waiting time instead.
+    """
+
+    def __init__(self, window: int = 500):
+        # (seconds, censored)
+        self._samples = collections.deque(maxlen=window)
+
+    def add(self, secs: float):
+        self._samples.append((secs, False))
+
+    def add_censored(self, secs: float):
+        self._samples.append((secs, True))
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(secs for secs, _ in self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def summary(self) -> dict:
+        def ms(value):
+            return None if value is None else round(value * 1000)
+
+        return {
+            "count": len(self._samples),
+            "censored": sum(censored for _, censored in self._samples),
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+        }
+
+
+# Time to first audio byte per provider, shared by every call in this worker.
+ttfb_stats: Dict[str, LatencyStats] = collections.defaultdict(LatencyStats)
+hedge_counts: Dict[str, int] = collections.Counter()
+
+
+def ttfb_summary() -> dict:
+    return {
+        "ttfb": {name: stats.summary() for name, stats in ttfb_stats.items()},
+        "hedges": dict(hedge_counts),
+    }
+
+
+def summarize_turns(turns: List[dict]) -> dict:
+    prompt = sum(turn.get("prompt_tokens", 0) for turn in turns)
+    cached = sum(turn.get("cached_tokens", 0) for turn in turns)
+    ttfts = sorted(turn["ttft_ms"] for turn in turns if turn["ttft_ms"] is not None)
+    p95 = ttfts[min(len(ttfts) - 1, len(ttfts) * 95 // 100)] if ttfts else None
+    return {
+        "turns": len(turns),
+        "models": sorted({turn["model"] for turn in turns}),
+        "prompt_tokens": prompt,
+        "cached_tokens": cached,
+        "completion_tokens": sum(turn.get("completion_tokens", 0) for turn in turns),
+        "cached_ratio": round(cached / prompt, 3) if prompt else None,
+        "mean_ttft_ms": round(sum(ttfts) / len(ttfts)) if ttfts else None,
+        "p95_ttft_ms": p95,
+    }
+
+
+# Recent turns per (node, model), shared by every call in this worker.
+node_turns: Dict[tuple, collections.deque] = collections.defaultdict(
+    lambda: collections.deque(maxlen=500)
+)
+
+
+def node_summary() -> dict:
+    return {
+        f"{node}/{model}": summarize_turns(list(turns))
+        for (node, model), turns in list(node_turns.items())
+    }
@@ -0,0 +1,84 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Open and prime a call's ElevenLabs connection before the guest answers.
+
+`dial.py` tells the server about a call as soon as Twilio accepts it, which
+is usually several seconds before the media stream connects. In that window
+the server opens the TTS websocket for the caller's voice and synthesizes a
+throwaway word on a second connection, so the websocket, TLS handshake and
+voice load are all done by the time the bot says its first line. The bot's
+TTS service (`tts.PrewarmedElevenLabsTTSService`) then adopts the parked
+connection instead of dialing ElevenLabs itself.
+
+This module doesn't import pipecat, so the server can create the pool
+without paying for the service imports at startup.
+
+Parked connections live in the worker that received the prewarm request. With
+several workers the stream may land elsewhere, in which case the bot simply
+connects as usual (the voice is still warm on ElevenLabs' side).
+"""
+
+import asyncio
+import json
+import time
+from typing import Dict, Tuple
+
+from loguru import logger
+
+
+def is_open(websocket) -> bool:
+    return websocket is not None and websocket.close_code is None
+
+
+class TTSConnectionPool:
+    def __init__(self, ttl: float = 90.0, keepalive_interval: float = 10.0):
+        self.ttl = ttl
+        self.keepalive_interval = keepalive_interval
+        self._connections: Dict[str, Tuple[object, float]] = {}
+        self._keepalive_tasks: Dict[str, asyncio.Task] = {}
+
+    def put(self, key: str, websocket):
+        self.discard(key)
+        self._connections[key] = (websocket, time.monotonic())
+        self._keepalive_tasks[key] = asyncio.create_task(
+            self._keepalive(key, websocket)
+        )
+
+    def take(self, key: str):
+        """Hand over the parked connection for `key`, if it is still usable."""
+        entry = self._connections.pop(key, None)
+        task = self._keepalive_tasks.pop(key, None)
+        if task:
+            task.cancel()
+        if entry is None:
+            return None
+        websocket, _ = entry
+        return websocket if is_open(websocket) else None
+
+    def discard(self, key: str):
+        websocket = self.take(key)
+        if websocket is not None:
+            asyncio.create_task(websocket.close())
+
+    async def _keepalive(self, key: str, websocket):
+        # ElevenLabs drops idle sockets after 20s; a single space keeps the
+        # connection open without producing audio.
+        try:
+            while time.monotonic() - self._connections[key][1] < self.ttl:
+                await asyncio.sleep(self.keepalive_interval)
+                await websocket.send(json.dumps({"text": " "}))
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logger.debug(f"Prewarmed TTS connection {key} lost: {e}")
+        self._connections.pop(key, None)
+        self._keepalive_tasks.pop(key, None)
+        if is_open(websocket):
+            await websocket.close()
+
+    def __len__(self):
+        return len(self._connections)
@@ -0,0 +1,306 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Call state shared by every convo server worker.
+
+Uvicorn/gunicorn workers are separate processes, so anything the websocket
+handler needs to know about a call (which profile to speak with, how many
+calls are already running) can't live on ``app.state``. It lives here, in a
+small SQLite database that every worker opens on its own.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+DEFAULT_DB_PATH = os.getenv("CONVO_STATE_DB", "output/convo_state.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS calls (
+    call_sid TEXT PRIMARY KEY,
+    number TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stream_sid TEXT,
+    worker_pid INTEGER,
+    -- Tells a running worker from an earlier one that had the same pid
+    worker_identity TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    ended_at REAL
+);
+CREATE INDEX IF NOT EXISTS calls_status ON calls (status);
+CREATE TABLE IF NOT EXISTS provider_leases (
+    call_sid TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    PRIMARY KEY (call_sid, provider)
+);
+-- Slots held for calls admitted by the webhook whose stream hasn't started
+CREATE TABLE IF NOT EXISTS reservations (
+    call_sid TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Columns added after the first release, with their definitions, for
+# databases created before them.
+MIGRATIONS = {
+    "calls": {"worker_identity": "TEXT"},
+}
+
+
+def profile_key(phone_number: str) -> str:
+    """Normalize a phone number the same way the voicemail server names folders."""
+    return re.sub(r"[^a-zA-Z0-9]", "_", phone_number).lstrip("_")
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _process_identity(pid: int) -> Optional[str]:
+    """The boot and start time of process `pid`, or None without /proc.
+
+    PIDs are reused, and a container's workers get the same small PIDs every
+    time it restarts, so a live PID doesn't mean the call's worker is running.
+    """
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name can contain spaces; start time is the 22nd field.
+    start_ticks = stat.rsplit(")", 1)[1].split()[19]
+    return f"{boot_id}:{start_ticks}"
+
+
+def _worker_running(pid: Optional[int], identity: Optional[str]) -> bool:
+    if not _pid_alive(pid):
+        return False
+    return identity is None or _process_identity(pid) == identity
+
+
+class CallRegistry:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._pid: Optional[int] = None
+        self._identity: Optional[str] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # SQLite connections must not cross a fork or be shared between
+        # threads, so every worker process, and every thread that blocking
+        # work is handed to, lazily opens its own.
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+            local.conn = conn
+            local.pid = os.getpid()
+            if self._pid != local.pid:
+                self._pid = local.pid
+                self._identity = _process_identity(self._pid)
+        return local.conn
+
+    def _migrate(self, conn: sqlite3.Connection):
+        for table, columns in MIGRATIONS.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, definition in columns.items():
+                if column not in existing:
+                    try:
+                        conn.execute(
+                            f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                        )
+                    except sqlite3.OperationalError:
+                        # Another worker added it first.
+                        pass
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the database write lock, so a read-then-write is atomic across workers."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    # Settings
+
+    def set_default_number(self, phone_number: str):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES ('default_number', ?)",
+            (profile_key(phone_number),),
+        )
+
+    def get_default_number(self) -> Optional[str]:
+        # The environment is per deployment, while the settings row outlives
+        # the server that wrote it, so the environment wins.
+        number = os.getenv("CONVO_PHONE_NUMBER")
+        if number:
+            return profile_key(number)
+        row = self.conn.execute(
+            "SELECT value FROM settings WHERE key = 'default_number'"
+        ).fetchone()
+        return row[0] if row else None
+
+    # Call routing
+
+    def route_call(self, call_sid: str, phone_number: str):
+        """Record which profile an outbound call should be answered with."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO calls (call_sid, number, status, created_at) "
+            "VALUES (?, ?, 'dialed', ?)",
+            (call_sid, profile_key(phone_number), time.time()),
+        )
+
+    def lookup_call(self, call_sid: str) -> Optional[str]:
+        row = self.conn.execute(
+            "SELECT number FROM calls WHERE call_sid = ?", (call_sid,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def call_started(
+        self,
+        call_sid: str,
+        phone_number: str,
+        stream_sid: str,
+        providers: Iterable[str] = (),
+    ):
+        now = time.time()
+        conn = self.conn
+        conn.execute(
+            "INSERT INTO calls (call_sid, number, status, stream_sid, worker_pid, "
+            "worker_identity, created_at, started_at) "
+            "VALUES (?, ?, 'active', ?, ?, ?, ?, ?) "
+            "ON CONFLICT (call_sid) DO UPDATE SET status = 'active', "
+            "stream_sid = excluded.stream_sid, worker_pid = excluded.worker_pid, "
+            "worker_identity = excluded.worker_identity, "
+            "started_at = excluded.started_at",
+            (
+                call_sid,
+                profile_key(phone_number),
+                stream_sid,
+                self._pid,
+                self._identity,
+                now,
+                now,
+            ),
+        )
+        self.conn.execute("DELETE FROM reservations WHERE call_sid = ?", (call_sid,))
+        for provider in providers:
+            self.lease_provider(call_sid, provider)
+
+    def call_ended(self, call_sid: str, status: str = "completed"):
+        self.conn.execute(
+            "UPDATE calls SET status = ?, ended_at = ? WHERE call_sid = ?",
+            (status, time.time(), call_sid),
+        )
+        self.conn.execute("DELETE FROM provider_leases WHERE call_sid = ?", (call_sid,))
+
+    def reserve_call(self, call_sid: str, ttl: float):
+        """Hold a slot for an admitted call until its stream starts or `ttl` passes."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO reservations (call_sid, expires_at) VALUES (?, ?)",
+            (call_sid, time.time() + ttl),
+        )
+
+    def reserved_calls(self) -> int:
+        now = time.time()
+        self.conn.execute("DELETE FROM reservations WHERE expires_at <= ?", (now,))
+        return self.conn.execute("SELECT COUNT(*) FROM reservations").fetchone()[0]
+
+    def lease_provider(self, call_sid: str, provider: str):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO provider_leases (call_sid, provider) VALUES (?, ?)",
+            (call_sid, provider),
+        )
+
+    def release_provider(self, call_sid: str, provider: str):
+        self.conn.execute(
+            "DELETE FROM provider_leases WHERE call_sid = ? AND provider = ?",
+            (call_sid, provider),
+        )
+
+    def reset_active_calls(self):
+        """Mark calls left active by a previous (crashed) server as abandoned."""
+        self.conn.execute(
+            "UPDATE calls SET status = 'abandoned', ended_at = ? WHERE status = 'active'",
+            (time.time(),),
+        )
+        self.conn.execute("DELETE FROM provider_leases")
+        self.conn.execute("DELETE FROM reservations")
+
+    def expire_stale_calls(self) -> int:
+        """Mark active calls whose worker process is gone as abandoned.
+
+        Unlike `reset_active_calls`, this is safe to run while other workers
+        are serving calls, so each worker runs it as it starts. A worker
+        counts as gone if its PID now belongs to a different process.
+        """
+        rows = self.conn.execute(
+            "SELECT call_sid, worker_pid, worker_identity FROM calls "
+            "WHERE status = 'active'"
+        ).fetchall()
+        stale = [
+            call_sid
+            for call_sid, pid, identity in rows
+            if not _worker_running(pid, identity)
+        ]
+        for call_sid in stale:
+            self.call_ended(call_sid, "abandoned")
+        return len(stale)
+
+    def active_calls(self) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM calls WHERE status = 'active'"
+        ).fetchone()[0]
+
+    def provider_calls(self) -> Dict[str, int]:
+        return dict(
+            self.conn.execute(
+                "SELECT provider, COUNT(*) FROM provider_leases GROUP BY provider"
+            ).fetchall()
+        )
+
+    # Counters
+
+    def incr_counter(self, name: str, amount: int = 1):
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def counters(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
@@ -5,16 +5,66 @@
 #
 
 import argparse
+import asyncio
 import json
+import os
+import traceback
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
 import yaml
 
 import uvicorn
-from bot import run_bot
-from fastapi import FastAPI, WebSocket
+from admin import create_admin_router
+from admission import CALL_PROVIDERS, AdmissionController
+from bot import open_catalog, preload_services, prewarm_call, run_bot
+from diagnostics import AllocationTracker, CallProfiler, LoopLagMonitor
+from metrics import node_summary, ttfb_summary
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from prewarm import TTSConnectionPool
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import HTMLResponse
+from registry import CallRegistry
+from starlette.responses import HTMLResponse, JSONResponse
 
-app = FastAPI()
+# Every worker process opens its own connection to the shared store, so
+# settings made by the parent process (or by `dial.py`) are visible here.
+registry = CallRegistry()
+loop_lag = LoopLagMonitor()
+admission = AdmissionController(registry, loop_lag)
+call_profiler = CallProfiler()
+allocations = AllocationTracker()
+tts_pool = TTSConnectionPool()
+# Strong references to fire-and-forget tasks so they aren't collected early.
+background_tasks = set()
+
+
+def forget_task(task: asyncio.Task):
+    """Drop a finished background task, printing the exception it raised."""
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        error = task.exception()
+        print(f"Background task {task.get_name()} failed:", flush=True)
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Calls left active by a worker that crashed would hold admission slots
+    # and provider leases forever.
+    stale = registry.expire_stale_calls()
+    if stale:
+        print(f"Marked {stale} calls from stopped workers as abandoned")
+    loop_lag.start()
+    call_profiler.install(asyncio.get_running_loop())
+    # Service imports are deferred so the port binds quickly; load them off
+    # the loop right away so the first call doesn't pay for them.
+    preload = asyncio.create_task(asyncio.to_thread(preload_services))
+    background_tasks.add(preload)
+    preload.add_done_callback(forget_task)
+    yield
+    await loop_lag.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,15 +74,55 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(create_admin_router(loop_lag, call_profiler, allocations))
+
+
+def is_testing() -> bool:
+    return os.getenv("CONVO_TESTING", "0") == "1"
+
 
 @app.post("/")
-async def start_call():
+async def start_call(request: Request):
     print("POST TwiML")
+    form = parse_qs((await request.body()).decode())
+    call_sid = form.get("CallSid", [None])[0]
+    # Admission waits for the registry's write lock, which other workers may
+    # hold under a rush of calls; wait in a thread, not on the calls' loop.
+    reason = await asyncio.to_thread(admission.admit, call_sid)
+    if reason:
+        # Fast reject: turn the caller away before any bot resources are spent.
+        print(f"Rejecting call: {reason}")
+        await asyncio.to_thread(admission.reject, reason)
+        return HTMLResponse(
+            content=open("templates/busy.xml").read(), media_type="application/xml"
+        )
     return HTMLResponse(
         content=open("templates/streams.xml").read(), media_type="application/xml"
     )
 
 
+@app.post("/prewarm/{call_sid}")
+async def prewarm(call_sid: str):
+    # Called by `dial.py` right after the call is placed; returns at once and
+    # warms up in the background while the guest's phone rings.
+    phone_number = registry.lookup_call(call_sid)
+    if not phone_number:
+        raise HTTPException(status_code=404, detail="unknown call")
+    task = asyncio.create_task(
+        prewarm_call(call_sid, phone_number, is_testing(), tts_pool)
+    )
+    background_tasks.add(task)
+    task.add_done_callback(forget_task)
+    return JSONResponse({"call_sid": call_sid, "status": "prewarming"}, 202)
+
+
+@app.get("/stats")
+async def stats():
+    return JSONResponse(
+        {**admission.stats(), "tts": ttfb_summary(), "llm": node_summary()}
+    )
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -41,8 +131,40 @@ async def websocket_endpoint(websocket: WebSocket):
     call_data = json.loads(await start_data.__anext__())
     print(call_data, flush=True)
     stream_sid = call_data["start"]["streamSid"]
+    call_sid = call_data["start"].get("callSid", stream_sid)
     print("WebSocket connection accepted")
-    await run_bot(websocket, stream_sid, app.state.testing, app.state.phone_number)
+
+    # Calls placed by `dial.py` are routed to their own profile; anything else
+    # (inbound calls, test clients) falls back to the server's default number.
+    phone_number = registry.lookup_call(call_sid) or registry.get_default_number()
+    if not phone_number:
+        print(f"No profile routed for call {call_sid}, closing")
+        await websocket.close()
+        return
+
+    registry.call_started(call_sid, phone_number, stream_sid, CALL_PROVIDERS)
+    catalog = None
+    outcome = "failed"
+    try:
+        catalog = open_catalog()
+        catalog.start_call(call_sid, phone_number)
+        with call_profiler.track(call_sid):
+            await run_bot(
+                websocket,
+                stream_sid,
+                is_testing(),
+                phone_number,
+                registry,
+                call_sid,
+                tts_pool,
+            )
+        outcome = "completed"
+    finally:
+        registry.call_ended(call_sid, outcome)
+        tts_pool.discard(call_sid)
+        if catalog:
+            catalog.finish_call(call_sid, outcome)
+            catalog.close()
 
 
 if __name__ == "__main__":
@@ -61,9 +183,27 @@ if __name__ == "__main__":
         required=True,
         help="phone number to load profile for",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes",
+    )
+    parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=8765,
+        help="port to listen on",
+    )
     args, _ = parser.parse_known_args()
 
-    app.state.testing = args.test
-    app.state.phone_number = args.number
+    # Workers are spawned as fresh processes, so configuration is handed over
+    # through the environment and the shared registry rather than `app.state`.
+    os.environ["CONVO_TESTING"] = "1" if args.test else "0"
+    os.environ["CONVO_PHONE_NUMBER"] = args.number
+    registry.set_default_number(args.number)
+    registry.reset_active_calls()
 
-    uvicorn.run(app, host="0.0.0.0", port=8765)
+    uvicorn.run("server:app", host="0.0.0.0", port=args.port, workers=args.workers)
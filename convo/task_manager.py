@@ -0,0 +1,52 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Task manager that makes sure a cancelled pipeline task really ends.
+
+pipecat's `TaskManager.cancel_task` cancels a task once and waits for it.
+Some tasks can swallow that cancellation: the input transport's audio task
+may be cancelling its own push task (whose `CancelledError` pipecat catches)
+when the caller hangs up mid-interruption, and on Python 3.11 `wait_for`
+drops a cancellation that lands as its inner wait completes. The swallowed
+task keeps running, the cancel never returns, and the call never ends.
+"""
+
+import asyncio
+from typing import Optional
+
+from loguru import logger
+
+from pipecat.utils.asyncio import TaskManager
+
+
+class RecancellingTaskManager(TaskManager):
+    """Cancels a task again every `retry_secs` until it has finished."""
+
+    def __init__(self, retry_secs: float = 0.5):
+        super().__init__()
+        self._retry_secs = retry_secs
+
+    async def cancel_task(self, task: asyncio.Task, timeout: Optional[float] = None):
+        if task is asyncio.current_task():
+            # A task can't wait for itself; let pipecat report it.
+            return await super().cancel_task(task, timeout)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        while not task.done():
+            task.cancel()
+            wait = self._retry_secs
+            if deadline is not None:
+                wait = min(wait, deadline - loop.time())
+                if wait <= 0:
+                    name = task.get_name()
+                    logger.warning(f"{name}: timed out waiting for task to cancel")
+                    self._remove_task(task)
+                    return
+            await asyncio.wait({task}, timeout=wait)
+            if not task.done():
+                logger.debug(f"{task.get_name()}: ignored cancellation, retrying")
+        # Finished: this only collects the result and forgets the task.
+        await super().cancel_task(task)
@@ -0,0 +1,110 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Clause-level text aggregation for TTS.
+
+pipecat's default aggregator holds LLM text until a sentence is complete, so
+a reply that opens with a long sentence is silent until the whole sentence
+has streamed in. This aggregator lets the *first* chunk of each reply go as
+soon as it reaches a clause boundary (comma, semicolon, colon, dash) with a
+few words in it, or once a word or time budget runs out. After that first
+chunk the caller is already hearing audio, so the rest of the reply goes
+sentence by sentence as before, which keeps TTS prosody intact.
+"""
+
+import re
+import statistics
+import time
+from typing import List, Optional
+
+from pipecat.utils.string import match_endofsentence
+from pipecat.utils.text.base_text_aggregator import BaseTextAggregator
+
+# Punctuation that ends a clause, followed by whitespace (so "1,000" and
+# "co-op" don't count).
+CLAUSE_END = re.compile(r"[,;:–—]\s+|\s+-\s+")
+
+
+class ClauseTextAggregator(BaseTextAggregator):
+    def __init__(
+        self,
+        *,
+        min_words: int = 4,
+        max_words: int = 12,
+        max_wait_secs: float = 0.6,
+    ):
+        """
+        Args:
+            min_words: Fewest words the first chunk may have. Shorter
+                fragments sound clipped.
+            max_words: Flush the first chunk at a word boundary once it has
+                this many words, even without a clause boundary.
+            max_wait_secs: Flush the first chunk at a word boundary once text
+                has been waiting this long (and has at least `min_words`).
+        """
+        self.min_words = min_words
+        self.max_words = max_words
+        self.max_wait_secs = max_wait_secs
+
+        self._text = ""
+        self._turn_started: Optional[float] = None
+        self._first_sent = False
+        # Seconds between a reply's first text and its first TTS chunk.
+        self.first_chunk_waits: List[float] = []
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def aggregate(self, text: str) -> Optional[str]:
+        now = time.perf_counter()
+        if self._turn_started is None:
+            self._turn_started = now
+        self._text += text
+
+        end = self._split_point(now)
+        if not end:
+            return None
+        result, self._text = self._text[:end], self._text[end:]
+        if not self._first_sent:
+            self._first_sent = True
+            self.first_chunk_waits.append(now - self._turn_started)
+        return result
+
+    def _split_point(self, now: float) -> int:
+        sentence_end = match_endofsentence(self._text)
+        if sentence_end or self._first_sent:
+            return sentence_end
+
+        words = len(self._text.split())
+        if words < self.min_words:
+            return 0
+        for clause in reversed(list(CLAUSE_END.finditer(self._text))):
+            if len(self._text[: clause.end()].split()) >= self.min_words:
+                return clause.end()
+        if words >= self.max_words or now - self._turn_started >= self.max_wait_secs:
+            # Only split after a complete word; the last one may still be
+            # streaming in.
+            return self._text.rstrip().rfind(" ") + 1
+        return 0
+
+    def handle_interruption(self):
+        self.reset()
+
+    def reset(self):
+        self._text = ""
+        self._turn_started = None
+        self._first_sent = False
+
+    def metrics(self) -> dict:
+        waits = self.first_chunk_waits
+        return {
+            "turns": len(waits),
+            "first_chunk_wait_ms_p50": (
+                round(statistics.median(waits) * 1000) if waits else None
+            ),
+            "first_chunk_wait_ms_max": round(max(waits) * 1000) if waits else None,
+        }
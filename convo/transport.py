@@ -0,0 +1,40 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Media stream transport that survives the caller hanging up mid-sentence.
+
+pipecat's FastAPI websocket client only looks at the caller's side of the
+socket to decide whether it is connected. When the caller hangs up while the
+bot is sending audio, the failed send closes our side first; the client
+still thinks it is connected, so cancelling the pipeline tries to close the
+socket again. That raises halfway through propagating the `CancelFrame`, the
+rest of the pipeline never hears about it, and the call never ends.
+"""
+
+from starlette.websockets import WebSocketState
+
+from pipecat.transports.network.fastapi_websocket import (
+    FastAPIWebsocketClient,
+    FastAPIWebsocketTransport,
+)
+
+
+class TwilioWebsocketClient(FastAPIWebsocketClient):
+    @property
+    def is_connected(self) -> bool:
+        return (
+            self._websocket.client_state == WebSocketState.CONNECTED
+            and self._websocket.application_state == WebSocketState.CONNECTED
+        )
+
+
+class TwilioWebsocketTransport(FastAPIWebsocketTransport):
+    def __init__(self, websocket, params, **kwargs):
+        super().__init__(websocket, params, **kwargs)
+        client = TwilioWebsocketClient(
+            websocket, self._client._is_binary, self._callbacks
+        )
+        self._client = self._input._client = self._output._client = client
@@ -0,0 +1,132 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""TTS services used by the bot."""
+
+import asyncio
+import json
+from typing import Optional
+
+from loguru import logger
+
+from pipecat.frames.frames import CancelFrame, EndFrame, StartFrame
+from pipecat.services.elevenlabs import (
+    ElevenLabsHttpTTSService,
+    ElevenLabsTTSService,
+    output_format_from_sample_rate,
+)
+
+from prewarm import TTSConnectionPool, is_open
+
+
+def output_format_for(sample_rate: int) -> str:
+    # pipecat's mapping has no telephony rate; ElevenLabs serves PCM at 8 kHz.
+    if sample_rate == 8000:
+        return "pcm_8000"
+    return output_format_from_sample_rate(sample_rate)
+
+
+class PrewarmedElevenLabsTTSService(ElevenLabsTTSService):
+    """ElevenLabs TTS that reuses a connection opened at dial time, if any.
+
+    Also requests 8 kHz PCM when the pipeline runs at the telephony rate, and
+    makes connecting safe to race. pipecat reconnects from whichever task
+    noticed the need (an interruption, `run_tts`, the receive task), so two
+    connects could both find no socket and the second would drop the first
+    without closing it; a connect finishing after the call's teardown would
+    likewise leave a socket open. Either one stays open, with its websocket
+    tasks, for the life of the worker.
+    """
+
+    def __init__(
+        self,
+        *,
+        pool: Optional[TTSConnectionPool] = None,
+        pool_key: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._pool = pool
+        self._pool_key = pool_key
+        self._finished = False
+        self._connection_lock = asyncio.Lock()
+
+    async def stop(self, frame: EndFrame):
+        self._finished = True
+        await super().stop(frame)
+
+    async def cancel(self, frame: CancelFrame):
+        self._finished = True
+        await super().cancel(frame)
+
+    async def _connect(self):
+        if self._finished:
+            return
+        await super()._connect()
+        if self._finished:
+            # Stopped while this was connecting.
+            await self._disconnect()
+
+    async def _connect_websocket(self):
+        async with self._connection_lock:
+            if self._finished or self._websocket:
+                return
+            websocket = (
+                self._pool.take(self._pool_key)
+                if self._pool and self._pool_key
+                else None
+            )
+            if websocket is not None:
+                logger.debug(f"{self}: using prewarmed connection for {self._pool_key}")
+                self._websocket = websocket
+                return
+            self._output_format = output_format_for(self.sample_rate)
+            await super()._connect_websocket()
+
+    async def _disconnect_websocket(self):
+        async with self._connection_lock:
+            await super()._disconnect_websocket()
+
+    async def prewarm(self, prime_text: str = "Hi.", timeout: float = 5.0):
+        """Connect, and load the voice by synthesizing `prime_text`.
+
+        Returns the open websocket, ready to be adopted by another instance
+        with the same voice and settings, or None if the connection failed.
+        The text is synthesized on a second, throwaway connection, so none of
+        its audio can be left queued on the one the call adopts.
+        """
+        # Normally chosen in start(), which a service that never joins a
+        # pipeline doesn't get.
+        self._output_format = output_format_for(self.sample_rate)
+        await super()._connect_websocket()
+        websocket, self._websocket = self._websocket, None
+        if not is_open(websocket):
+            return None
+        if prime_text:
+            await super()._connect_websocket()
+            primer, self._websocket = self._websocket, None
+            if is_open(primer):
+                try:
+                    await asyncio.wait_for(self._prime(primer, prime_text), timeout)
+                except Exception as e:
+                    # The adopted connection is fine; the voice just isn't warm.
+                    logger.debug(f"{self}: priming the voice failed: {e!r}")
+                finally:
+                    await primer.close()
+        return websocket
+
+    async def _prime(self, websocket, text: str):
+        await websocket.send(json.dumps({"text": f"{text} ", "flush": True}))
+        while not json.loads(await websocket.recv()).get("isFinal"):
+            pass
+
+
+class TelephonyElevenLabsHttpTTSService(ElevenLabsHttpTTSService):
+    """ElevenLabs HTTP TTS that can generate 8 kHz PCM, for hedged TTS."""
+
+    async def start(self, frame: StartFrame):
+        await super().start(frame)
+        self._output_format = output_format_for(self.sample_rate)
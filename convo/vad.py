@@ -0,0 +1,222 @@
+#
+# Copyright (c) 2025, Daily
+#
+# SPDX-License-Identifier: BSD 2-Clause License
+#
+
+"""Silero VAD that tunes its end-of-turn threshold to the caller.
+
+A fixed `stop_secs` is too long for fast talkers (dead air after every turn)
+and too short for slow ones (the bot cuts in mid-thought). This analyzer
+watches the pauses a caller takes *inside* their turns during the first
+exchanges and sets `stop_secs` just above them. A frame counts as speech by
+the same test pipecat's state machine uses (confident and loud enough), and
+dips of fewer than `min_pause_frames` frames aren't counted as pauses.
+
+A pause longer than the current `stop_secs` ends the turn, so it is never
+seen mid-turn. If the caller starts talking again within
+`resume_window_secs` of a declared end of turn (and keeps going long enough
+to start a new one), the turn was cut off: the
+whole pause is counted, and `stop_secs` is raised past it. It also raises
+the speech confidence threshold when the line's background noise floor is
+high.
+"""
+
+import statistics
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from pipecat.audio.vad.silero import SileroVADAnalyzer
+from pipecat.audio.vad.vad_analyzer import VADParams, VADState
+
+
+class AdaptiveVADAnalyzer(SileroVADAnalyzer):
+    def __init__(
+        self,
+        *,
+        params: Optional[VADParams] = None,
+        min_stop_secs: float = 0.35,
+        max_stop_secs: float = 1.2,
+        stop_margin_secs: float = 0.15,
+        learning_turns: int = 3,
+        min_pauses: int = 3,
+        min_pause_frames: int = 2,
+        resume_window_secs: float = 0.5,
+        max_confidence: float = 0.85,
+        **kwargs,
+    ):
+        super().__init__(params=params or VADParams(), **kwargs)
+        self.min_stop_secs = min_stop_secs
+        self.max_stop_secs = max_stop_secs
+        self.stop_margin_secs = stop_margin_secs
+        self.learning_turns = learning_turns
+        self.min_pauses = min_pauses
+        self.min_pause_frames = min_pause_frames
+        self.resume_window_secs = resume_window_secs
+        self.max_confidence = max_confidence
+
+        self._base_confidence = self._params.confidence
+        self._audio_time = 0.0
+        self._state = VADState.QUIET
+        self._frame: Optional[Tuple[float, float]] = None
+        self._pause_frames = 0
+        self._pause_secs = 0.0
+        self._last_voiced: Optional[float] = None
+        self._pauses: List[float] = []
+        self._turn_ended_at: Optional[float] = None
+        self._resumed_pause: Optional[float] = None
+        self._cut_off_pauses: List[float] = []
+        self._readapt = False
+        self._quiet_confidences: List[float] = []
+        self._turns = 0
+        self.end_of_turn_delays: List[float] = []
+
+    def voice_confidence(self, buffer) -> float:
+        confidence = super().voice_confidence(buffer)
+        self._frame = (confidence, len(buffer) / (2 * self.sample_rate))
+        return confidence
+
+    def analyze_audio(self, buffer) -> VADState:
+        state = super().analyze_audio(buffer)
+        # The base class only runs the model once a whole frame is buffered.
+        if self._frame is not None:
+            confidence, secs = self._frame
+            self._frame = None
+            self._track(confidence, secs)
+        if self._resumed_pause is not None and state != VADState.STARTING:
+            # Only count it if the caller really started talking again.
+            if state == VADState.SPEAKING:
+                self._on_cut_off(self._resumed_pause)
+            self._resumed_pause = None
+        if state == VADState.QUIET and self._in_turn:
+            self._on_turn_end()
+        self._state = state
+        return state
+
+    def _track(self, confidence: float, secs: float):
+        self._audio_time += secs
+        # The same test as the base class, with the smoothed volume it just
+        # computed for this frame, so a confident but faint frame is a pause.
+        voiced = (
+            confidence >= self._params.confidence
+            and self._prev_volume >= self._params.min_volume
+        )
+        learning = self._turns < self.learning_turns
+        if voiced:
+            if self._pause_frames >= self.min_pause_frames:
+                if learning and self._in_turn:
+                    # Speech resumed before the turn was declared over, so
+                    # this was a pause the caller takes mid-turn.
+                    self._pauses.append(self._pause_secs)
+                elif self._cut_off():
+                    self._resumed_pause = self._pause_secs
+            self._pause_frames = 0
+            self._pause_secs = 0.0
+            self._turn_ended_at = None
+            self._last_voiced = self._audio_time
+        else:
+            self._pause_frames += 1
+            self._pause_secs += secs
+            if (
+                learning
+                and self._state == VADState.QUIET
+                and confidence < self._params.confidence
+            ):
+                self._quiet_confidences.append(confidence)
+
+    @property
+    def _in_turn(self) -> bool:
+        return self._state in (VADState.SPEAKING, VADState.STOPPING)
+
+    def _cut_off(self) -> bool:
+        """Whether speech resuming now means a learning turn ended too soon."""
+        return (
+            self._turn_ended_at is not None
+            and self._turns <= self.learning_turns
+            and self._audio_time - self._turn_ended_at <= self.resume_window_secs
+        )
+
+    def _on_cut_off(self, pause_secs: float):
+        logger.debug(
+            f"{self}: turn {self._turns} was cut off by a "
+            f"{pause_secs * 1000:.0f}ms pause"
+        )
+        self._pauses.append(pause_secs)
+        self._cut_off_pauses.append(pause_secs)
+        self._readapt = True
+
+    def _on_turn_end(self):
+        self._turns += 1
+        if self._last_voiced is not None:
+            # Audio time between the caller's last voiced frame and the moment
+            # we decided they were done: the dead air this threshold costs.
+            delay = self._audio_time - self._last_voiced
+            self.end_of_turn_delays.append(delay)
+            logger.debug(
+                f"{self}: end of turn {self._turns} detected after {delay * 1000:.0f}ms"
+            )
+        # The pause keeps counting, in case the caller carries on.
+        self._turn_ended_at = self._audio_time
+        if self._turns <= self.learning_turns or self._readapt:
+            self._readapt = False
+            self._adapt()
+
+    def _adapt(self):
+        params = self._params
+        stop_secs = params.stop_secs
+        if len(self._pauses) >= self.min_pauses:
+            pauses = sorted(self._pauses)
+            longest_typical = pauses[min(len(pauses) - 1, int(len(pauses) * 0.9))]
+            stop_secs = min(
+                self.max_stop_secs,
+                max(self.min_stop_secs, longest_typical + self.stop_margin_secs),
+            )
+        if self._cut_off_pauses:
+            # However few pauses there are, never cut the caller off at the
+            # same length again.
+            stop_secs = max(
+                stop_secs,
+                min(
+                    self.max_stop_secs,
+                    max(self._cut_off_pauses) + self.stop_margin_secs,
+                ),
+            )
+
+        confidence = params.confidence
+        if len(self._quiet_confidences) >= 50:
+            noise = sorted(self._quiet_confidences)
+            noise_floor = noise[int(len(noise) * 0.95)]
+            confidence = min(
+                self.max_confidence, max(self._base_confidence, noise_floor + 0.1)
+            )
+
+        if stop_secs != params.stop_secs or confidence != params.confidence:
+            logger.debug(
+                f"{self}: adapting stop_secs {params.stop_secs:.2f} -> {stop_secs:.2f}, "
+                f"confidence {params.confidence:.2f} -> {confidence:.2f}"
+            )
+            # Only ever called right after a turn ends, so resetting the
+            # analyzer's state machine here can't cut off speech.
+            self.set_params(
+                VADParams(
+                    confidence=confidence,
+                    start_secs=params.start_secs,
+                    stop_secs=stop_secs,
+                    min_volume=params.min_volume,
+                )
+            )
+
+    def metrics(self) -> dict:
+        delays = self.end_of_turn_delays
+        return {
+            "turns": self._turns,
+            "stop_secs": self._params.stop_secs,
+            "confidence": self._params.confidence,
+            "mid_turn_pauses": len(self._pauses),
+            "cut_off_turns": len(self._cut_off_pauses),
+            "end_of_turn_delay_ms_p50": (
+                round(statistics.median(delays) * 1000) if delays else None
+            ),
+            "end_of_turn_delay_ms_max": round(max(delays) * 1000) if delays else None,
+        }
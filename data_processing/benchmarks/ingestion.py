@@ -0,0 +1,389 @@
+"""
+Benchmark caller ingestion without Deepgram or ElevenLabs accounts.
+
+Generates synthetic caller folders from the WAVs in twilio/recordings, registers
+them in a scratch caller catalog and runs `process_caller` on each against local
+HTTP stand-ins for Deepgram and ElevenLabs with configurable latency and error
+rates. Callers with a failed transcription or voice clone are picked up again on
+the next pass, the same way rerunning process_caller_data.py would, for up to
+--passes passes.
+
+Reports callers/minute, bytes uploaded to each service, requests that repeated
+an earlier one (retries) and peak memory. Use --output to append the results
+as a JSON line so runs can be compared over time. Exits non-zero if any caller
+is still not ready to dial after the last pass.
+
+    python benchmarks/ingestion.py --callers 50 --parallel 4 \
+        --elevenlabs-error-rate 0.1
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import wave
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DATA_PROCESSING_DIR = Path(__file__).resolve().parent.parent
+WORKSPACE_ROOT = DATA_PROCESSING_DIR.parent
+SEED_GLOB = str(WORKSPACE_ROOT / "twilio" / "recordings" / "*.wav")
+
+sys.path.insert(0, str(DATA_PROCESSING_DIR))
+
+READ_CHUNK = 64 * 1024
+# Bytes of each request body kept for identifying repeated requests.
+HEAD_BYTES = 64 * 1024
+
+
+class StandInStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.errors = Counter()
+        self.bytes_received = Counter()
+        self.seen = Counter()
+
+    def record(self, service: str, key: str, body_bytes: int, failed: bool):
+        with self.lock:
+            self.requests[service] += 1
+            self.bytes_received[service] += body_bytes
+            self.seen[(service, key)] += 1
+            if failed:
+                self.errors[service] += 1
+
+    def retries(self, service: str) -> int:
+        return sum(
+            count - 1 for (name, _), count in self.seen.items() if name == service
+        )
+
+
+def create_stand_in(args, stats: StandInStats, recordings_dir: str):
+    """HTTP server answering like Deepgram's /v1/listen and ElevenLabs'
+    /v1/voices/add, and serving recordings for URL transcription."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *log_args):
+            pass
+
+        def read_body(self):
+            """Read the request body in chunks; return (size, first bytes)."""
+            size = 0
+            head = b""
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                while True:
+                    length = int(self.rfile.readline().split(b";")[0], 16)
+                    if length == 0:
+                        self.rfile.readline()
+                        break
+                    remaining = length
+                    while remaining:
+                        chunk = self.rfile.read(min(READ_CHUNK, remaining))
+                        remaining -= len(chunk)
+                        size += len(chunk)
+                        if len(head) < HEAD_BYTES:
+                            head += chunk[: HEAD_BYTES - len(head)]
+                    self.rfile.readline()
+            else:
+                remaining = int(self.headers.get("Content-Length", 0))
+                while remaining:
+                    chunk = self.rfile.read(min(READ_CHUNK, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    size += len(chunk)
+                    if len(head) < HEAD_BYTES:
+                        head += chunk[: HEAD_BYTES - len(head)]
+            return size, head
+
+        def respond(self, status: int, payload: dict):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def simulate(self, latency_ms: float, error_rate: float) -> bool:
+            time.sleep(latency_ms * random.uniform(0.75, 1.25) / 1000)
+            return random.random() < error_rate
+
+        def do_GET(self):
+            # Recording downloads, standing in for Twilio's media URLs.
+            path = os.path.join(recordings_dir, os.path.basename(self.path))
+            if not os.path.isfile(path):
+                self.respond(404, {"error": "not found"})
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/wav")
+            self.send_header("Content-Length", str(os.path.getsize(path)))
+            self.end_headers()
+            with open(path, "rb") as f:
+                while chunk := f.read(READ_CHUNK):
+                    self.wfile.write(chunk)
+
+        def do_POST(self):
+            size, head = self.read_body()
+            if self.path.startswith("/v1/listen"):
+                self.deepgram(size, head)
+            elif self.path.startswith("/v1/voices/add"):
+                self.elevenlabs(size, head)
+            else:
+                self.respond(404, {"error": "not found"})
+
+        def deepgram(self, size: int, head: bytes):
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                key = json.loads(head)["url"]
+                # Deepgram fetches URL sources itself; that download isn't
+                # an upload from the ingestion machine.
+                uploaded = 0
+                with urllib.request.urlopen(key) as recording:
+                    while recording.read(READ_CHUNK):
+                        pass
+            else:
+                key = f"{size}:{hashlib.sha1(head).hexdigest()}"
+                uploaded = size
+            failed = self.simulate(args.deepgram_latency_ms, args.deepgram_error_rate)
+            stats.record("deepgram", key, uploaded, failed)
+            if failed:
+                self.respond(500, {"err_msg": "injected failure"})
+                return
+            alternative = {"transcript": "Synthetic caller", "confidence": 0.99}
+            self.respond(
+                200,
+                {
+                    "metadata": {
+                        "transaction_key": "deprecated",
+                        "request_id": hashlib.sha1(key.encode()).hexdigest(),
+                        "sha256": "",
+                        "created": "2025-01-01T00:00:00Z",
+                        "duration": 1.0,
+                        "channels": 1,
+                        "models": [],
+                        "model_info": {},
+                    },
+                    "results": {
+                        "channels": [{"alternatives": [{**alternative, "words": []}]}]
+                    },
+                },
+            )
+
+        def elevenlabs(self, size: int, head: bytes):
+            match = re.search(rb'name="name"\r\n\r\n([^\r]*)', head)
+            key = match.group(1).decode() if match else str(size)
+            failed = self.simulate(
+                args.elevenlabs_latency_ms, args.elevenlabs_error_rate
+            )
+            stats.record("elevenlabs", key, size, failed)
+            if failed:
+                self.respond(500, {"detail": "injected failure"})
+                return
+            voice_id = hashlib.sha1(key.encode()).hexdigest()[:20]
+            self.respond(200, {"voice_id": voice_id, "requires_verification": False})
+
+    return ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+
+def load_seeds():
+    seeds = []
+    for path in sorted(glob(SEED_GLOB)):
+        with wave.open(path) as wf:
+            seeds.append((wf.getparams(), wf.readframes(wf.getnframes())))
+    if not seeds:
+        sys.exit(f"No seed recordings found in {SEED_GLOB}")
+    return seeds
+
+
+def write_answer(path: str, seeds, index: int, min_secs: float):
+    """Write a seed recording, looped until it is at least `min_secs` long."""
+    params, frames = seeds[index % len(seeds)]
+    with wave.open(path, "wb") as wf:
+        wf.setparams(params)
+        wf.writeframes(frames)
+        written = params.nframes / params.framerate
+        while written < min_secs:
+            wf.writeframes(frames)
+            written += params.nframes / params.framerate
+
+
+def create_callers(args, catalog, workspace: str, base_url: str):
+    from catalog import QUESTIONS
+
+    seeds = load_seeds()
+    recordings_dir = os.path.join(workspace, "recordings")
+    os.makedirs(recordings_dir, exist_ok=True)
+    numbers = []
+    for i in range(args.callers):
+        number = f"1555{i:07d}"
+        folder = os.path.join(workspace, "data", number, "files")
+        os.makedirs(folder, exist_ok=True)
+        for j, question in enumerate(QUESTIONS):
+            file_path = os.path.join("data", number, "files", f"{question}.wav")
+            abs_path = os.path.join(workspace, file_path)
+            write_answer(abs_path, seeds, i + j, args.answer_secs)
+            recording_url = None
+            if args.source == "url":
+                name = f"{number}_{question}.wav"
+                os.link(abs_path, os.path.join(recordings_dir, name))
+                recording_url = f"{base_url}/recordings/{name}"
+            catalog.add_recording(
+                number, question, file_path=file_path, recording_url=recording_url
+            )
+        numbers.append(number)
+    return numbers, recordings_dir
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=WORKSPACE_ROOT,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--callers", type=int, default=20)
+    parser.add_argument(
+        "-p", "--parallel", type=int, default=1, help="callers processed at once"
+    )
+    parser.add_argument("--passes", type=int, default=3)
+    parser.add_argument(
+        "--answer-secs",
+        type=float,
+        default=0.0,
+        help="make every answer at least this long by looping seed audio",
+    )
+    parser.add_argument(
+        "--source",
+        choices=["url", "file"],
+        default="url",
+        help="give Deepgram recording URLs (as for Twilio callers) or upload files",
+    )
+    parser.add_argument("--deepgram-latency-ms", type=float, default=300)
+    parser.add_argument("--deepgram-error-rate", type=float, default=0.0)
+    parser.add_argument("--elevenlabs-latency-ms", type=float, default=1500)
+    parser.add_argument("--elevenlabs-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="append the results to this JSON lines file")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    stats = StandInStats()
+    with tempfile.TemporaryDirectory() as workspace:
+        recordings_dir = os.path.join(workspace, "recordings")
+        server = create_stand_in(args, stats, recordings_dir)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        os.environ.update(
+            DEEPGRAM_API_KEY="benchmark",
+            DEEPGRAM_API_URL=base_url,
+            ELEVENLABS_API_KEY="benchmark",
+            ELEVENLABS_API_URL=base_url,
+            CALLER_CATALOG=os.path.join(workspace, "catalog.sqlite3"),
+        )
+        os.environ.pop("TWILIO_API_KEY_SID", None)
+        os.environ.pop("TWILIO_API_KEY_SECRET", None)
+
+        from catalog import CallerCatalog
+        from process_caller_data import process_caller
+
+        catalog = CallerCatalog()
+        numbers, _ = create_callers(args, catalog, workspace, base_url)
+        audio_bytes = sum(
+            os.path.getsize(os.path.join(workspace, r["file_path"]))
+            for number in numbers
+            for r in catalog.recordings(number)
+        )
+        print(
+            f"{len(numbers)} synthetic callers, "
+            f"{audio_bytes / 2**20:.1f} MB of answers ({args.source} sources)"
+        )
+
+        def process(number: str):
+            # sqlite connections belong to the thread that opened them
+            thread_catalog = CallerCatalog()
+            try:
+                process_caller(number, thread_catalog, workspace)
+            finally:
+                thread_catalog.close()
+
+        start = time.perf_counter()
+        passes = 0
+        while passes < args.passes:
+            pending = catalog.needs_processing()
+            if not pending:
+                break
+            passes += 1
+            with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+                list(pool.map(process, pending))
+        elapsed = time.perf_counter() - start
+
+        ready_numbers = {caller["number"] for caller in catalog.ready_to_dial()}
+        ready = len(ready_numbers)
+        not_ready = [number for number in numbers if number not in ready_numbers]
+        catalog.close()
+        server.shutdown()
+
+    results = {
+        "revision": git_revision(),
+        "config": vars(args),
+        "callers": len(numbers),
+        "ready": ready,
+        "not_ready": not_ready,
+        "passes": passes,
+        "elapsed_secs": round(elapsed, 2),
+        "callers_per_min": round(ready / elapsed * 60, 2) if elapsed else None,
+        "requests": dict(stats.requests),
+        "errors_injected": dict(stats.errors),
+        "retries": {name: stats.retries(name) for name in stats.requests},
+        "bytes_uploaded": dict(stats.bytes_received),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+
+    print(f"Ready to dial: {ready}/{len(numbers)} after {passes} pass(es)")
+    print(f"Throughput: {results['callers_per_min']} callers/min ({elapsed:.1f}s)")
+    for service in sorted(stats.requests):
+        print(
+            f"{service}: {stats.requests[service]} requests, "
+            f"{stats.errors[service]} injected errors, "
+            f"{stats.retries(service)} retries, "
+            f"{stats.bytes_received[service] / 2**20:.1f} MB uploaded"
+        )
+    print(f"Peak RSS: {results['peak_rss_mb']} MB")
+
+    if args.output:
+        with open(args.output, "a") as f:
+            f.write(json.dumps(results) + "\n")
+
+    if not_ready:
+        sys.exit(
+            f"{len(not_ready)} callers not ready to dial after {passes} pass(es): "
+            + ", ".join(not_ready)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+import argparse
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+# Answers each caller records on the voicemail line, in the order asked.
+QUESTIONS = ["name", "like", "hate", "memory", "message"]
+
+WORKSPACE_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = WORKSPACE_ROOT / "data" / "catalog.sqlite3"
+SCHEMA_PATH = Path(__file__).resolve().parent / "catalog.sql"
+
+TRANSCRIBED_COUNT = """
+    SELECT COUNT(*) FROM recordings r
+    WHERE r.number = c.number AND r.transcript IS NOT NULL
+"""
+
+# A caller is ready to dial once every answer has a transcript and their voice
+# has been cloned from the current recordings.
+READY_CONDITION = f"""
+    c.voice_id IS NOT NULL AND NOT c.voice_stale
+    AND ({TRANSCRIBED_COUNT}) >= {len(QUESTIONS)}
+"""
+
+# A caller needs processing while any recording lacks a transcript, or once
+# every answer is transcribed but the voice is missing or out of date.
+# Callers still partway through the voicemail wait for the rest of it.
+NEEDS_PROCESSING_CONDITION = f"""
+    EXISTS (
+        SELECT 1 FROM recordings r
+        WHERE r.number = c.number AND r.transcript IS NULL
+    )
+    OR (
+        (c.voice_id IS NULL OR c.voice_stale)
+        AND ({TRANSCRIBED_COUNT}) >= {len(QUESTIONS)}
+    )
+"""
+
+# Columns added after the first release, with their definitions, for
+# catalogs created before them.
+MIGRATIONS = {
+    "callers": {"voice_stale": "INTEGER NOT NULL DEFAULT 0"},
+}
+
+
+def default_db_path() -> Path:
+    """$CALLER_CATALOG, resolved against the workspace root, or the default."""
+    path = os.getenv("CALLER_CATALOG")
+    return WORKSPACE_ROOT / path if path else DEFAULT_DB_PATH
+
+
+class CallerCatalog:
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Open (creating if needed) the caller catalog.
+
+        A new catalog starts out with any callers found as per-folder YAML
+        files next to it, so data from before the catalog isn't lost.
+
+        Args:
+            db_path (str, optional): Path to the SQLite file. Defaults to
+                $CALLER_CATALOG (relative to the workspace root, so every
+                process resolves it the same way), or data/catalog.sqlite3
+                in the workspace root.
+        """
+        self.db_path = str(db_path or default_db_path())
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        created = not os.path.exists(self.db_path)
+        self.conn = sqlite3.connect(self.db_path, timeout=10)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA_PATH.read_text())
+        self._migrate()
+        if created:
+            count = self.import_yaml(os.path.dirname(self.db_path))
+            if count:
+                print(f"Imported {count} callers from YAML into {self.db_path}")
+
+    def _migrate(self):
+        for table, columns in MIGRATIONS.items():
+            existing = {
+                row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")
+            }
+            for column, definition in columns.items():
+                if column not in existing:
+                    with self.conn:
+                        self.conn.execute(
+                            f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                        )
+
+    def close(self):
+        self.conn.close()
+
+    # Writes
+
+    def upsert_caller(
+        self, number: str, name: Optional[str] = None, voice_id: Optional[str] = None
+    ) -> None:
+        """
+        Create a caller, or update whichever of name/voice_id is given. A new
+        voice_id marks the voice as cloned from the current recordings.
+        """
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO callers (number, name, voice_id) VALUES (?, ?, ?)
+                ON CONFLICT (number) DO UPDATE SET
+                    name = COALESCE(excluded.name, name),
+                    voice_id = COALESCE(excluded.voice_id, voice_id),
+                    voice_stale = CASE
+                        WHEN excluded.voice_id IS NOT NULL THEN 0 ELSE voice_stale
+                    END,
+                    updated_at = datetime('now')
+                """,
+                (number, name, voice_id),
+            )
+
+    def add_recording(
+        self,
+        number: str,
+        question: str,
+        file_path: Optional[str] = None,
+        recording_url: Optional[str] = None,
+        recording_sid: Optional[str] = None,
+    ) -> None:
+        """
+        Record (or re-record) one answer. Fields that aren't given are kept.
+
+        When the recording itself changes (a new recording SID, or a new file
+        for an answer without one), its transcript is cleared and the caller's
+        voice is marked for re-cloning. Filling in the file for a recording
+        that is already known, such as after the voicemail server finishes
+        downloading it, changes neither.
+        """
+        self.upsert_caller(number)
+        previous = self.conn.execute(
+            "SELECT * FROM recordings WHERE number = ? AND question = ?",
+            (number, question),
+        ).fetchone()
+        if previous is None:
+            changed = True
+        elif recording_sid is not None:
+            changed = recording_sid != previous["recording_sid"]
+        else:
+            changed = file_path is not None and file_path != previous["file_path"]
+
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO recordings
+                    (number, question, file_path, recording_url, recording_sid)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (number, question) DO UPDATE SET
+                    file_path = COALESCE(excluded.file_path, file_path),
+                    recording_url = COALESCE(excluded.recording_url, recording_url),
+                    recording_sid = COALESCE(excluded.recording_sid, recording_sid),
+                    transcript = CASE WHEN ? THEN NULL ELSE transcript END,
+                    updated_at = datetime('now')
+                """,
+                (number, question, file_path, recording_url, recording_sid, changed),
+            )
+            if changed and previous is not None:
+                self.conn.execute(
+                    """
+                    UPDATE callers SET voice_stale = 1, updated_at = datetime('now')
+                    WHERE number = ? AND voice_id IS NOT NULL
+                    """,
+                    (number,),
+                )
+
+    def set_transcript(self, number: str, question: str, transcript: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                """
+                UPDATE recordings SET transcript = ?, updated_at = datetime('now')
+                WHERE number = ? AND question = ?
+                """,
+                (transcript, number, question),
+            )
+
+    def start_call(self, call_sid: str, number: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO calls (call_sid, number) VALUES (?, ?)",
+                (call_sid, number),
+            )
+
+    def finish_call(self, call_sid: str, outcome: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                """
+                UPDATE calls SET outcome = ?, ended_at = datetime('now')
+                WHERE call_sid = ?
+                """,
+                (outcome, call_sid),
+            )
+
+    # Reads
+
+    def get_caller(self, number: str) -> Optional[Dict]:
+        """
+        Look up one caller.
+
+        Args:
+            number (str): The caller's number, as used for their data folder
+
+        Returns:
+            Optional[Dict]: The caller in the same shape as full_metadata.yaml
+                (number, name, voice_id, <question>_file, <question>_transcript),
+                plus <question>_url, or None if unknown.
+        """
+        row = self.conn.execute(
+            "SELECT * FROM callers WHERE number = ?", (number,)
+        ).fetchone()
+        if row is None:
+            return None
+        return self._with_recordings(row)
+
+    def get_ready_caller(self, number: str) -> Optional[Dict]:
+        """
+        Look up one caller, only if they are ready to dial.
+
+        Args:
+            number (str): The caller's number, as used for their data folder
+
+        Returns:
+            Optional[Dict]: The caller as returned by get_caller, or None if
+                unknown, any answer is untranscribed or the voice is stale.
+        """
+        row = self.conn.execute(
+            f"SELECT * FROM callers c WHERE c.number = ? AND {READY_CONDITION}",
+            (number,),
+        ).fetchone()
+        if row is None:
+            return None
+        return self._with_recordings(row)
+
+    def recordings(self, number: str) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT * FROM recordings WHERE number = ?", (number,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def ready_to_dial(self) -> List[Dict]:
+        rows = self.conn.execute(
+            f"SELECT * FROM callers c WHERE {READY_CONDITION} ORDER BY c.updated_at"
+        ).fetchall()
+        return [self._with_recordings(row) for row in rows]
+
+    def needs_processing(self) -> List[str]:
+        """Numbers of callers with untranscribed answers or a voice to (re)clone."""
+        rows = self.conn.execute(
+            f"""
+            SELECT c.number FROM callers c
+            WHERE {NEEDS_PROCESSING_CONDITION}
+            ORDER BY c.created_at
+            """
+        ).fetchall()
+        return [row["number"] for row in rows]
+
+    def call_history(self, number: str) -> List[Dict]:
+        rows = self.conn.execute(
+            "SELECT * FROM calls WHERE number = ? ORDER BY started_at", (number,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _with_recordings(self, caller: sqlite3.Row) -> Dict:
+        result = {
+            "number": caller["number"],
+            "name": caller["name"],
+            "voice_id": caller["voice_id"],
+            "voice_stale": bool(caller["voice_stale"]),
+        }
+        for recording in self.recordings(caller["number"]):
+            question = recording["question"]
+            result[f"{question}_file"] = recording["file_path"]
+            result[f"{question}_url"] = recording["recording_url"]
+            result[f"{question}_transcript"] = recording["transcript"]
+        return result
+
+    # YAML interchange
+
+    def import_yaml(self, data_dir: str) -> int:
+        """
+        Import callers from per-folder calldata.yaml / full_metadata.yaml files.
+
+        Args:
+            data_dir (str): Directory containing one folder per caller
+
+        Returns:
+            int: Number of callers imported
+        """
+        count = 0
+        for folder in sorted(Path(data_dir).iterdir()):
+            metadata = {}
+            for filename in ("calldata.yaml", "full_metadata.yaml"):
+                path = folder / filename
+                if path.is_file():
+                    with open(path) as f:
+                        metadata.update(yaml.safe_load(f) or {})
+            if not metadata:
+                continue
+
+            number = str(metadata.get("number", folder.name))
+            for question in QUESTIONS:
+                file_path = metadata.get(f"{question}_file")
+                if file_path:
+                    self.add_recording(number, question, file_path=file_path)
+                transcript = metadata.get(f"{question}_transcript")
+                if transcript:
+                    self.set_transcript(number, question, transcript)
+            self.upsert_caller(number, metadata.get("name"), metadata.get("voice_id"))
+            count += 1
+        return count
+
+    def export_yaml(self, data_dir: str) -> int:
+        """
+        Write calldata.yaml and full_metadata.yaml for every processed caller.
+
+        Args:
+            data_dir (str): Directory to write the per-caller folders into
+
+        Returns:
+            int: Number of callers exported
+        """
+        rows = self.conn.execute("SELECT * FROM callers").fetchall()
+        for row in rows:
+            caller = self._with_recordings(row)
+            folder = Path(data_dir) / caller["number"]
+            folder.mkdir(parents=True, exist_ok=True)
+
+            calldata = {"number": caller["number"]}
+            for question in QUESTIONS:
+                if caller.get(f"{question}_file"):
+                    calldata[f"{question}_file"] = caller[f"{question}_file"]
+            with open(folder / "calldata.yaml", "w") as f:
+                yaml.dump(calldata, f, default_flow_style=False)
+
+            if caller["voice_id"] is not None:
+                full_metadata = dict(calldata, name=caller["name"])
+                full_metadata["voice_id"] = caller["voice_id"]
+                for question in QUESTIONS:
+                    if caller.get(f"{question}_transcript"):
+                        full_metadata[f"{question}_transcript"] = caller[
+                            f"{question}_transcript"
+                        ]
+                with open(folder / "full_metadata.yaml", "w") as f:
+                    yaml.dump(full_metadata, f, default_flow_style=False)
+        return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the caller catalog")
+    parser.add_argument("--db", help="path to the catalog database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command in ("import", "export"):
+        sub = subparsers.add_parser(command, help=f"{command} per-caller YAML files")
+        sub.add_argument("data_dir", nargs="?", default=str(WORKSPACE_ROOT / "data"))
+    add = subparsers.add_parser("add-recording", help="record one caller answer")
+    add.add_argument("number")
+    add.add_argument("question", choices=QUESTIONS)
+    add.add_argument("--file", help="path relative to the workspace root")
+    add.add_argument("--url", help="Twilio RecordingUrl")
+    add.add_argument("--sid", help="Twilio RecordingSid")
+    subparsers.add_parser("ready", help="list callers ready to dial")
+    show = subparsers.add_parser("show", help="show one caller")
+    show.add_argument("number")
+    args = parser.parse_args()
+
+    catalog = CallerCatalog(args.db)
+    if args.command == "import":
+        print(f"Imported {catalog.import_yaml(args.data_dir)} callers")
+    elif args.command == "export":
+        print(f"Exported {catalog.export_yaml(args.data_dir)} callers")
+    elif args.command == "add-recording":
+        catalog.add_recording(
+            args.number,
+            args.question,
+            file_path=args.file,
+            recording_url=args.url,
+            recording_sid=args.sid,
+        )
+    elif args.command == "ready":
+        for caller in catalog.ready_to_dial():
+            print(f"{caller['number']}\t{caller['name']}")
+    elif args.command == "show":
+        print(yaml.dump(catalog.get_caller(args.number), default_flow_style=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+-- Caller catalog schema, shared by data_processing/catalog.py and the
+-- voicemail server. Every statement must be safe to run on an existing db.
+
+PRAGMA journal_mode = WAL;
+
+CREATE TABLE IF NOT EXISTS callers (
+    number TEXT PRIMARY KEY,
+    name TEXT,
+    voice_id TEXT,
+    -- Set when a recording changes after the voice was cloned
+    voice_stale INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+CREATE TABLE IF NOT EXISTS recordings (
+    number TEXT NOT NULL REFERENCES callers (number),
+    question TEXT NOT NULL,
+    file_path TEXT,
+    recording_url TEXT,
+    recording_sid TEXT,
+    transcript TEXT,
+    updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+    PRIMARY KEY (number, question)
+);
+
+CREATE TABLE IF NOT EXISTS calls (
+    call_sid TEXT PRIMARY KEY,
+    number TEXT NOT NULL REFERENCES callers (number),
+    outcome TEXT,
+    started_at TEXT NOT NULL DEFAULT (datetime('now')),
+    ended_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS calls_number ON calls (number);
@@ -1,18 +1,123 @@
 import requests
 import os
 import json
+import time
+import uuid
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 
+class MultipartFileStream:
+    """
+    A multipart/form-data body that reads its files from disk as it is sent.
+
+    requests sends a body that has read() and a length as it reads it, with a
+    Content-Length header, so only about one chunk of the upload is in memory
+    at a time however long the recordings are. Tracks how many bytes have been
+    read and how fast, for the upload byte-rate.
+    """
+
+    def __init__(self, fields, files, chunk_size=64 * 1024):
+        """
+        Parameters:
+        - fields (dict): Form fields and their string values.
+        - files (list of tuple): (field name, file path, mimetype) for each file.
+        - chunk_size (int, optional): Bytes read from disk at a time.
+        """
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.chunk_size = chunk_size
+
+        self._parts = []  # bytes, or a path to read from disk
+        for name, value in fields.items():
+            self._parts.append(
+                self._part_header(f'name="{name}"') + str(value).encode() + b"\r\n"
+            )
+        for name, path, mimetype in files:
+            filename = os.path.basename(path).replace('"', "%22")
+            self._parts.append(
+                self._part_header(
+                    f'name="{name}"; filename="{filename}"',
+                    f"Content-Type: {mimetype}\r\n",
+                )
+            )
+            self._parts.append(path)
+            self._parts.append(b"\r\n")
+        self._parts.append(f"--{self.boundary}--\r\n".encode())
+
+        self._length = sum(
+            len(part) if isinstance(part, bytes) else os.path.getsize(part)
+            for part in self._parts
+        )
+        self._chunks = self._iter_chunks()
+        self._buffer = b""
+        self.bytes_read = 0
+        self.started = None
+        self.finished = None
+
+    def _part_header(self, disposition, extra_headers=""):
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: form-data; {disposition}\r\n"
+            f"{extra_headers}\r\n"
+        ).encode()
+
+    def _iter_chunks(self):
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+            with open(part, "rb") as f:
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+
+    def close(self):
+        self._chunks.close()
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        if self.started is None:
+            self.started = time.perf_counter()
+        if size is None or size < 0:
+            size = self._length
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self.bytes_read += len(data)
+        if self.bytes_read == self._length and self.finished is None:
+            self.finished = time.perf_counter()
+        return data
+
+    def upload_stats(self):
+        """Bytes sent, seconds spent sending them, and the resulting byte rate."""
+        seconds = (self.finished or time.perf_counter()) - (
+            self.started or time.perf_counter()
+        )
+        return {
+            "bytes": self.bytes_read,
+            "seconds": seconds,
+            "bytes_per_second": self.bytes_read / seconds if seconds > 0 else None,
+        }
+
+
 class ElevenLabsWrapper:
     def __init__(self):
         """Initialize the Deepgram transcriber with API key from environment variables."""
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
         if not self.api_key:
             raise ValueError("DEEPGRAM_API_KEY not found in environment variables")
+        # Size and speed of the most recent voice upload
+        self.last_upload = None
 
     def add_voice(self, name, description="", labels=None, file_paths=None):
         """
@@ -34,7 +139,10 @@ class ElevenLabsWrapper:
         # Load API key directly
         api_key = os.getenv("ELEVENLABS_API_KEY")
 
-        url = "https://api.elevenlabs.io/v1/voices/add"
+        # ELEVENLABS_API_URL points at another endpoint, such as a local
+        # stand-in when benchmarking.
+        base_url = os.getenv("ELEVENLABS_API_URL", "https://api.elevenlabs.io")
+        url = f"{base_url}/v1/voices/add"
         headers = {"xi-api-key": api_key}
 
         # Prepare the multipart form-data payload
@@ -44,23 +152,30 @@ class ElevenLabsWrapper:
             data["labels"] = json.dumps(labels)
 
         files = []
-        file_objs = []  # to track file objects so we can close them later
         if file_paths:
             for path in file_paths:
                 if os.path.isfile(path):
-                    f = open(path, "rb")
-                    file_objs.append(f)
-                    # Each file is a tuple: (filename, file-object, mimetype)
-                    files.append(("files", (os.path.basename(path), f, "audio/mpeg")))
+                    # Each file is a tuple: (field name, path, mimetype)
+                    files.append(("files", path, "audio/mpeg"))
                 else:
                     print(f"File not found: {path}")
 
+        # Stream the body from disk instead of letting requests build the
+        # whole multipart body in memory
+        body = MultipartFileStream(data, files)
+        headers["Content-Type"] = body.content_type
         try:
-            response = requests.post(url, headers=headers, data=data, files=files)
+            response = requests.post(url, headers=headers, data=body)
         finally:
-            # Close all file objects to prevent resource leaks
-            for f in file_objs:
-                f.close()
+            # Close the file being read if the upload stopped part-way
+            body.close()
+
+        self.last_upload = body.upload_stats()
+        rate = self.last_upload["bytes_per_second"]
+        print(
+            f"Uploaded {self.last_upload['bytes'] / 2**20:.1f} MB for {name}"
+            + (f" at {rate / 2**20:.2f} MB/s" if rate else "")
+        )
 
         if response.status_code == 200:
             return response.json()
@@ -1,9 +1,10 @@
 import os
-import yaml
 import string
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from deepgram_wrapper import DeepgramWrapper
+from typing import Optional
+from catalog import QUESTIONS, CallerCatalog
+from deepgram_wrapper import DeepgramWrapper, twilio_recording_url
 from elevenlabs_wrapper import ElevenLabsWrapper
 
 
@@ -30,109 +31,118 @@ def clean_name(name: str) -> str:
     return name.strip(string.punctuation + string.whitespace)
 
 
-def process_caller_folder(folder_path: str, workspace_root: str) -> None:
+def process_caller(number: str, catalog: CallerCatalog, workspace_root: str) -> None:
     """
-    Process a single caller folder by transcribing audio files and generating a voice model.
+    Process a single caller by transcribing their recordings and, once every answer
+    is transcribed, generating (or regenerating) a voice model.
 
     Args:
-        folder_path (str): Path to the caller's folder
+        number (str): The caller's number in the catalog
+        catalog (CallerCatalog): Catalog holding the caller's recordings
         workspace_root (str): Path to the workspace root directory
     """
-    # Check if full_metadata.yaml already exists
-    metadata_path = os.path.join(folder_path, "full_metadata.yaml")
-    if os.path.exists(metadata_path):
-        print(f"Skipping {folder_path} - full_metadata.yaml already exists")
-        return
-
-    # Load calldata.yaml
-    calldata_path = os.path.join(folder_path, "calldata.yaml")
-    if not os.path.exists(calldata_path):
-        print(f"Error: {calldata_path} not found")
-        return
-
-    with open(calldata_path, "r") as f:
-        calldata = yaml.safe_load(f)
+    caller = catalog.get_caller(number)
 
     # Initialize wrappers
     deepgram = DeepgramWrapper()
     elevenlabs = ElevenLabsWrapper()
-
-    # Create full metadata dictionary with original data
-    full_metadata = calldata.copy()
-
-    # List of audio files to process
-    audio_files = [
-        ("name_file", calldata.get("name_file")),
-        ("memory_file", calldata.get("memory_file")),
-        ("like_file", calldata.get("like_file")),
-        ("hate_file", calldata.get("hate_file")),
-        ("message_file", calldata.get("message_file")),
-    ]
-
-    # Process each audio file
+    # The credentials travel to Deepgram inside the recording URL, so they are
+    # a revocable Twilio API key, never the account's auth token. Without one
+    # the URL is sent as is, which works unless media auth is enforced.
+    twilio_auth = (os.getenv("TWILIO_API_KEY_SID"), os.getenv("TWILIO_API_KEY_SECRET"))
+
+    def transcribe(question: str) -> Optional[str]:
+        # Prefer having Deepgram fetch the recording straight from Twilio, so
+        # transcription doesn't wait on the local download.
+        recording_url = caller.get(f"{question}_url")
+        if recording_url:
+            transcript = deepgram.transcribe_url(
+                twilio_recording_url(recording_url),
+                auth=twilio_auth if all(twilio_auth) else None,
+            )
+            if transcript is not None or question not in file_paths:
+                return transcript
+        return deepgram.transcribe_file(file_paths[question])
+
+    # Local files are still needed for voice cloning
     valid_audio_files = []
-    for file_key, file_path in audio_files:
+    file_paths = {}
+    for question in QUESTIONS:
+        file_path = caller.get(f"{question}_file")
         if not file_path:
-            print(f"Warning: {file_key} not found in calldata.yaml")
+            print(f"Warning: no {question} recording for {number}")
             continue
 
         # Convert relative path to absolute path
         abs_file_path = os.path.join(workspace_root, file_path)
         if not os.path.exists(abs_file_path):
-            print(f"Warning: {file_key} file not found at: {abs_file_path}")
+            print(f"Warning: {question} file not found at: {abs_file_path}")
             continue
-
-        # Transcribe the audio
-        transcript = deepgram.transcribe_file(abs_file_path)
-        if transcript:
-            # Store transcript with _transcript suffix at top level
-            transcript_key = file_key.replace("_file", "_transcript")
-            full_metadata[transcript_key] = transcript
-            valid_audio_files.append(abs_file_path)
-        else:
-            print(f"Warning: Failed to transcribe {file_key}")
-
-    # Store the name separately (keeping this for backward compatibility)
-    if "name_transcript" in full_metadata:
-        full_metadata["name"] = clean_name(full_metadata["name_transcript"])
+        valid_audio_files.append(abs_file_path)
+        file_paths[question] = abs_file_path
+
+    # Answers transcribed on an earlier run are kept
+    pending = [
+        question
+        for question in QUESTIONS
+        if not caller.get(f"{question}_transcript")
+        and (caller.get(f"{question}_url") or question in file_paths)
+    ]
+    with ThreadPoolExecutor(max_workers=len(QUESTIONS)) as pool:
+        transcripts = pool.map(transcribe, pending)
+        for question, transcript in zip(pending, transcripts):
+            if transcript:
+                catalog.set_transcript(number, question, transcript)
+                if question == "name":
+                    catalog.upsert_caller(number, name=clean_name(transcript))
+            else:
+                print(f"Warning: Failed to transcribe {question}")
+
+    # Clone the voice only once every answer is transcribed, and again
+    # whenever a recording changed since the last clone
+    caller = catalog.get_caller(number)
+    missing = [q for q in QUESTIONS if not caller.get(f"{q}_transcript")]
+    if missing:
+        print(f"Not cloning {number} yet; missing transcripts: {', '.join(missing)}")
+        return
+    if caller["voice_id"] and not caller["voice_stale"]:
+        return
+    if len(valid_audio_files) < len(QUESTIONS):
+        # The voicemail server records the URL before the download finishes
+        print(f"Not cloning {number} yet; some recordings aren't downloaded")
+        return
 
     # Generate voice using ElevenLabs
     try:
         voice_result = elevenlabs.add_voice(
-            name=f"Caller_{calldata['number']}",
-            description=f"Voice model for caller {calldata['number']}",
+            name=f"Caller_{number}",
+            description=f"Voice model for caller {number}",
             labels={"type": "caller_voice"},
             file_paths=valid_audio_files,
         )
-        full_metadata["voice_id"] = voice_result.get("voice_id")
+        catalog.upsert_caller(number, voice_id=voice_result.get("voice_id"))
     except Exception as e:
-        print(f"Error generating voice for {folder_path}: {str(e)}")
-        full_metadata["voice_id"] = None
-
-    # Save full metadata
-    with open(metadata_path, "w") as f:
-        yaml.dump(full_metadata, f, default_flow_style=False)
+        print(f"Error generating voice for {number}: {str(e)}")
 
 
 def process_all_callers(data_dir: str = "../data") -> None:
     """
-    Process all caller folders in the data directory.
+    Process every caller in the catalog whose voice hasn't been generated yet.
 
     Args:
         data_dir (str): Path to the data directory containing caller folders
     """
     workspace_root = get_workspace_root()
 
-    # Get all subdirectories in the data directory
     data_path = Path(os.path.join(workspace_root, "data"))
     if not data_path.is_dir():
         print(f"Error: {data_dir} is not a directory")
         return
 
-    for item in data_path.iterdir():
-        if item.is_dir() and not item.name.startswith("."):
-            print(f"Processing caller folder: {item}")
-            process_caller_folder(str(item), workspace_root)
+    catalog = CallerCatalog()
+    for number in catalog.needs_processing():
+        print(f"Processing caller: {number}")
+        process_caller(number, catalog, workspace_root)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+import pytest
+
+from catalog import QUESTIONS, CallerCatalog
+
+NUMBER = "15555550100"
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = CallerCatalog(str(tmp_path / "catalog.sqlite3"))
+    yield catalog
+    catalog.close()
+
+
+def record_all(catalog, number=NUMBER, voice_id="voice-1"):
+    """Give a caller every answer, transcribed, and a cloned voice."""
+    for question in QUESTIONS:
+        catalog.add_recording(
+            number, question, file_path=f"{question}.wav", recording_sid=f"RE{question}"
+        )
+        catalog.set_transcript(number, question, f"My {question} answer.")
+    catalog.upsert_caller(number, "Sam", voice_id)
+
+
+def transcript(catalog, question, number=NUMBER):
+    return catalog.get_caller(number)[f"{question}_transcript"]
+
+
+def test_new_recording_needs_processing(catalog):
+    catalog.add_recording(NUMBER, "name", file_path="name.wav", recording_sid="RE1")
+
+    assert transcript(catalog, "name") is None
+    assert catalog.needs_processing() == [NUMBER]
+    assert catalog.ready_to_dial() == []
+
+
+def test_partial_voicemail_waits_for_the_rest(catalog):
+    catalog.add_recording(NUMBER, "name", file_path="name.wav", recording_sid="RE1")
+    catalog.set_transcript(NUMBER, "name", "Sam")
+
+    assert catalog.needs_processing() == []
+
+
+def test_transcribed_caller_without_voice_needs_processing(catalog):
+    record_all(catalog, voice_id=None)
+
+    assert catalog.needs_processing() == [NUMBER]
+    assert catalog.ready_to_dial() == []
+
+
+def test_processed_caller_is_ready(catalog):
+    record_all(catalog)
+
+    assert catalog.needs_processing() == []
+    assert [caller["number"] for caller in catalog.ready_to_dial()] == [NUMBER]
+    assert catalog.get_ready_caller(NUMBER)["voice_id"] == "voice-1"
+
+
+def test_same_sid_keeps_transcript_and_voice(catalog):
+    record_all(catalog)
+    # The voicemail server fills in the file once the download finishes.
+    catalog.add_recording(
+        NUMBER, "memory", file_path="memory-downloaded.wav", recording_sid="REmemory"
+    )
+
+    caller = catalog.get_caller(NUMBER)
+    assert caller["memory_file"] == "memory-downloaded.wav"
+    assert caller["memory_transcript"] == "My memory answer."
+    assert not caller["voice_stale"]
+    assert catalog.get_ready_caller(NUMBER) is not None
+
+
+def test_new_sid_clears_transcript_and_stales_voice(catalog):
+    record_all(catalog)
+    catalog.add_recording(
+        NUMBER, "memory", file_path="memory-2.wav", recording_sid="REmemory2"
+    )
+
+    caller = catalog.get_caller(NUMBER)
+    assert caller["memory_transcript"] is None
+    assert caller["voice_stale"]
+    assert catalog.needs_processing() == [NUMBER]
+    assert catalog.ready_to_dial() == []
+    assert catalog.get_ready_caller(NUMBER) is None
+
+    # Transcribed again, it still needs its voice re-cloned.
+    catalog.set_transcript(NUMBER, "memory", "My new memory answer.")
+    assert catalog.needs_processing() == [NUMBER]
+    assert catalog.get_ready_caller(NUMBER) is None
+
+    catalog.upsert_caller(NUMBER, voice_id="voice-2")
+    assert catalog.needs_processing() == []
+    assert catalog.get_ready_caller(NUMBER)["voice_id"] == "voice-2"
+
+
+def test_yaml_round_trip(catalog, tmp_path):
+    record_all(catalog)
+    catalog.add_recording("15555550101", "name", file_path="name.wav")
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+
+    assert catalog.export_yaml(str(data_dir)) == 2
+
+    copy = CallerCatalog(str(tmp_path / "copy" / "catalog.sqlite3"))
+    try:
+        assert copy.import_yaml(str(data_dir)) == 2
+        for number in (NUMBER, "15555550101"):
+            original = catalog.get_caller(number)
+            imported = copy.get_caller(number)
+            # Recording URLs and SIDs aren't part of the YAML files.
+            for question in QUESTIONS:
+                original.pop(f"{question}_url", None)
+                imported.pop(f"{question}_url", None)
+            assert imported == original
+        assert [c["number"] for c in copy.ready_to_dial()] == [NUMBER]
+    finally:
+        copy.close()
@@ -4,8 +4,6 @@ import os
 import sys
 import subprocess
 import time
-import yaml
-import glob
 import signal
 from pathlib import Path
 
@@ -92,59 +90,22 @@ def process_caller_data():
 
 
 def get_available_numbers():
-    numbers = []
-    # Use absolute paths
     root_dir = str(Path(__file__).parent)
-    data_dir = os.path.join(root_dir, "data")
-
-    print(f"\nCurrent directory in get_available_numbers: {os.getcwd()}")
-    print(f"Looking for data directory at: {data_dir}")
-    print(f"Data directory exists: {os.path.exists(data_dir)}")
-
-    # Ensure data directory exists
-    if not os.path.exists(data_dir):
-        print(f"Error: Data directory not found at {data_dir}")
-        return numbers
-
-    # List contents of data directory if it exists
-    if os.path.exists(data_dir):
-        print("\nContents of data directory:")
-        for item in os.listdir(data_dir):
-            item_path = os.path.join(data_dir, item)
-            if os.path.isdir(item_path):
-                print(f"  Directory: {item}")
-            else:
-                print(f"  File: {item}")
-
-    # Search for full_metadata.yaml files in data directory using absolute path
-    pattern = os.path.join(data_dir, "*/full_metadata.yaml")
-    print(f"\nSearching for metadata files with pattern: {pattern}")
-    metadata_files = glob.glob(pattern)
-    print(f"Found {len(metadata_files)} metadata files: {metadata_files}")
-
-    for metadata_file in metadata_files:
-        try:
-            print(f"\nReading metadata file: {metadata_file}")
-            with open(metadata_file, "r") as f:
-                metadata = yaml.safe_load(f)
-                print(f"Metadata: {metadata}")
-                if metadata and "number" in metadata and "name" in metadata:
-                    numbers.append(
-                        {
-                            "number": metadata["number"],
-                            "name": metadata["name"],
-                            "path": os.path.dirname(metadata_file),
-                        }
-                    )
-                    print(f"Successfully loaded number for: {metadata['name']}")
-                else:
-                    print("Metadata file missing required fields (number or name)")
-        except Exception as e:
-            print(f"Error reading {metadata_file}: {e}")
-
-    if not numbers:
-        print(f"\nNo metadata files found in {data_dir}")
-
+    sys.path.insert(0, os.path.join(root_dir, "data_processing"))
+    from catalog import CallerCatalog
+
+    catalog = CallerCatalog()
+    print(f"\nReading callers ready to dial from {catalog.db_path}")
+    numbers = [
+        {
+            "number": caller["number"],
+            "name": caller["name"],
+            "path": os.path.join(root_dir, "data", caller["number"]),
+        }
+        for caller in catalog.ready_to_dial()
+    ]
+    print(f"Found {len(numbers)} callers ready to dial")
+    catalog.close()
     return numbers
 
 
@@ -143,7 +143,24 @@ app.post("/end-call", (req, res) => {
     res.send(twiml.toString());
 });
 
-const yaml = require("js-yaml"); // Import the js-yaml package
+const { execFile } = require("child_process");
+
+// Caller catalog shared with data_processing/catalog.py. Writes go through its
+// CLI so both sides use the same schema and the same CALLER_CATALOG setting.
+const CATALOG_SCRIPT = path.join(__dirname, "../data_processing/catalog.py");
+const PYTHON = process.env.PYTHON || "python3";
+
+function addRecording(number, question, { filePath, recordingUrl, recordingSid }) {
+    const args = [CATALOG_SCRIPT, "add-recording", number, question];
+    if (filePath) args.push("--file", filePath);
+    if (recordingUrl) args.push("--url", recordingUrl);
+    if (recordingSid) args.push("--sid", recordingSid);
+    return new Promise((resolve, reject) => {
+        execFile(PYTHON, args, (error, stdout, stderr) =>
+            error ? reject(new Error(stderr || error.message)) : resolve(stdout)
+        );
+    });
+}
 
 app.post("/recording-complete", async (req, res) => {
     try {
@@ -159,6 +176,10 @@ app.post("/recording-complete", async (req, res) => {
         if (recordingUrl && recordingSid) {
             console.log(`Recording for ${question}: ${recordingUrl}`);
 
+            // Catalog the recording first, so transcription can fetch it from
+            // Twilio while the local copy is still downloading
+            await addRecording(callerId, question, { recordingUrl, recordingSid });
+
             // Create the caller-specific directory
             const callerDir = path.join(__dirname, "../data", callerId);
             if (!fs.existsSync(callerDir)) {
@@ -192,31 +213,13 @@ app.post("/recording-complete", async (req, res) => {
 
             console.log(`Recording saved to ${filePath}`);
 
-            // After all recordings for a caller are saved, generate the YAML file
-            const yamlFilePath = path.join(callerDir, "calldata.yaml"); // Fixed filename calldata.yaml
-
-            const yamlData = {
-                number: `${callerId}`, // number will not be quoted
-                name_file: `data/${callerId}/name.wav`,
-                memory_file: `data/${callerId}/memory.wav`,
-                like_file: `data/${callerId}/like.wav`,
-                hate_file: `data/${callerId}/hate.wav`,
-                message_file: `data/${callerId}/message.wav`,
-            };
-
-            // Write the YAML data to a file without quoting the number field
-            const yamlString = yaml.dump(yamlData, {
-                noRefs: true, // Disable references
-                lineWidth: -1, // Prevent line wrapping
-                quoteKeys: false, // Prevent quoting keys
-                indent: 2, // Use 2 spaces for indentation
-                skipInvalid: true, // Skip invalid properties (if any)
-                noCompatMode: true, // Disable YAML 1.1 compatibility mode (prevents quoting numbers)
+            // Same recording SID, so this keeps any transcript made meanwhile
+            await addRecording(callerId, question, {
+                filePath: `data/${callerId}/${filename}`,
+                recordingSid,
             });
 
-            fs.writeFileSync(yamlFilePath, yamlString);
-
-            console.log(`YAML file saved to ${yamlFilePath}`);
+            console.log(`Catalog updated for ${callerId} (${question})`);
         }
 
         res.sendStatus(200);